@@ -6,25 +6,261 @@
 
 
 # Importação das bibliotecas gráficas
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import tkinter as tk
+# São opcionais: sem elas (ou sem um display), o benchmark continua podendo ser executado com "--benchmark"
+try:
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.collections import LineCollection
+    import numpy as np
+    import tkinter as tk
+except ImportError:
+    plt = FigureCanvasTkAgg = LineCollection = np = tk = None
 # Básicas
+from array import array
+from contextlib import contextmanager
+from operator import attrgetter, itemgetter
+from collections import namedtuple, OrderedDict
+# Persistência
+from mmap import mmap as mapear_arquivo, ACCESS_READ
+import struct
+# Métricas
+import cProfile
+import pstats
+# Concorrência
+import threading
+from multiprocessing import Pipe, Process, resource_tracker, shared_memory
+import os
+# Servidor
+import asyncio
+from itertools import accumulate, islice
+import signal
+# Benchmark
+import argparse
+import bisect
+import gc
+import json
+import platform
+import random
+import sys
 import time
+import tracemalloc
+try:
+    from sortedcontainers import SortedList # Referência opcional do benchmark
+except ImportError:
+    SortedList = None
 
 # __init__ = construtor de inicialização da classe
 # self == this
 
 # Início Classe que representa o NÓ da Árvore
 class NO_AVL:
+    # "__slots__" elimina o dicionário (__dict__) de cada nó, reduzindo bastante a memória por chave
+    # Os campos "chave" (função key) e "dado" (modo mapa) só existem nas classes criadas por classe_no()
+    __slots__ = ('valor', 'esquerda', 'direita', 'altura')
+
     # A função é referente ao construtor, de maneira a definir e inicializar a própria classe
-    def __init__(self, valor): 
+    # "chave" e "dado" são aceitos para que todas as classes de nó tenham o mesmo construtor, e aqui são ignorados
+    def __init__(self, valor, chave=None, dado=None): 
         self.valor = valor
         self.esquerda = None
         self.direita = None
         self.altura = 1
 # Fim Classe NÓ AVL
 
+# Sem função key, a chave de comparação é o próprio valor: "no.chave" lê o campo "valor", sem ocupar memória
+NO_AVL.chave = NO_AVL.valor
+# Fora do modo mapa, nenhum nó tem carga
+NO_AVL.dado = None
+
+# Início Classe do NÓ com estatísticas de ordem, que também guarda o tamanho (quantidade de nós) da sua subárvore
+class NO_AVL_CONTADO(NO_AVL):
+    __slots__ = ('tamanho',)
+
+    def __init__(self, valor, chave=None, dado=None):
+        self.valor = valor
+        self.esquerda = None
+        self.direita = None
+        self.altura = 1
+        self.tamanho = 1
+# Fim Classe NÓ AVL contado
+
+# Início Classe do NÓ com agregado, que guarda o resumo (segundo o monoide da árvore) de toda a sua subárvore
+# Não tem o campo "tamanho": quem precisa saber se os tamanhos existem pode testar o próprio nó
+class NO_AVL_AGREGADO(NO_AVL):
+    __slots__ = ('agregado',)
+
+    # O agregado depende do monoide, então é calculado pela árvore assim que o nó entra nela
+    def __init__(self, valor, chave=None, dado=None):
+        self.valor = valor
+        self.esquerda = None
+        self.direita = None
+        self.altura = 1
+        self.agregado = None
+# Fim Classe NÓ AVL agregado
+
+# Início Classe do NÓ com estatísticas de ordem e agregado (árvores com as duas opções)
+class NO_AVL_AGREGADO_CONTADO(NO_AVL_CONTADO):
+    __slots__ = ('agregado',)
+
+    def __init__(self, valor, chave=None, dado=None):
+        self.valor = valor
+        self.esquerda = None
+        self.direita = None
+        self.altura = 1
+        self.tamanho = 1
+        self.agregado = None
+# Fim Classe NÓ AVL agregado e contado
+
+# Classes de nó que acrescentam a uma das classes acima o campo "chave" (árvores com função key) e/ou
+# o campo "dado" (modo mapa), criadas na primeira vez em que cada combinação é pedida e reaproveitadas depois
+CLASSES_NO = {}
+
+# Função que retorna a classe de nó derivada de "base" com os campos pedidos (a própria "base", se nenhum)
+def classe_no(base, com_chave=False, com_dado=False):
+    campos = ('chave',) * com_chave + ('dado',) * com_dado
+    if not campos:
+        return base
+    classe = CLASSES_NO.get((base, campos))
+    if classe is None:
+        iniciar_base = base.__init__
+
+        def __init__(self, valor, chave=None, dado=None):
+            iniciar_base(self, valor, chave)
+            if com_chave:
+                self.chave = valor if chave is None else chave
+            if com_dado:
+                self.dado = dado
+
+        nome = base.__name__ + '_CHAVE' * com_chave + '_MAPA' * com_dado
+        classe = CLASSES_NO[(base, campos)] = type(nome, (base,), {'__slots__': campos, '__init__': __init__})
+    return classe
+
+# Registro de um evento da árvore, acumulado em um buffer e entregue aos assinantes (ver ARVORE_AVL.assinar)
+# tipo: 'insercao', 'atualizacao', 'remocao', 'nao_encontrado', 'rotacao', 'carga', 'insercao_lote', 'remocao_lote',
+# 'uniao', 'intersecao' ou 'diferenca'
+# rotacao: 'direita', 'esquerda', 'esquerda_direita' ou 'direita_esquerda' (apenas nos eventos de rotação)
+# pivo: valor do nó desbalanceado sobre o qual a rotação foi feita; quantidade: valores envolvidos (lotes)
+EVENTO_AVL = namedtuple('EVENTO_AVL', ['tipo', 'chave', 'rotacao', 'pivo', 'quantidade'], defaults=(None, None, None, 1))
+
+# Mensagens do histórico para cada tipo de rotação
+MENSAGENS_ROTACAO = {
+    'direita': "Rotação simples à direita do nó {}",
+    'esquerda': "Rotação simples à esquerda do nó {}",
+    'esquerda_direita': "Rotação dupla (Esquerda-Direita) sobre o nó: {}",
+    'direita_esquerda': "Rotação dupla (Direita-Esquerda) sobre o nó: {}",
+}
+
+# Início Classe dos contadores de desempenho de uma árvore (ver ARVORE_AVL.ativar_metricas)
+# Por operação ('inserir', 'remover', 'buscar'): quantidade, nós visitados e comparações de chave na descida de busca
+# Também conta as rotações de cada um dos quatro casos e os nós alocados (criados ou copiados)
+# "gancho", se informado, é chamado a cada operação com (operacao, visitados, comparacoes), para amostragem externa
+class METRICAS_AVL:
+    OPERACOES = ('inserir', 'remover', 'buscar')
+
+    def __init__(self, gancho=None):
+        self.gancho = gancho
+        self.zerar()
+
+    # Zera todos os contadores
+    def zerar(self):
+        self.operacoes = dict.fromkeys(self.OPERACOES, 0)
+        self.visitados = dict.fromkeys(self.OPERACOES, 0)
+        self.comparacoes = dict.fromkeys(self.OPERACOES, 0)
+        self.rotacoes = dict.fromkeys(MENSAGENS_ROTACAO, 0)
+        self.alocacoes = 0
+
+    # Contabiliza uma operação
+    def registrar(self, operacao, visitados, comparacoes):
+        self.operacoes[operacao] += 1
+        self.visitados[operacao] += visitados
+        self.comparacoes[operacao] += comparacoes
+        if self.gancho is not None:
+            self.gancho(operacao, visitados, comparacoes)
+
+    # Retorna uma cópia dos contadores (um dicionário simples, pronto para JSON), com as médias por operação
+    def instantaneo(self):
+        operacoes = {}
+        for operacao, quantidade in self.operacoes.items():
+            operacoes[operacao] = {
+                'quantidade': quantidade,
+                'visitados': self.visitados[operacao],
+                'comparacoes': self.comparacoes[operacao],
+                'visitados_por_operacao': self.visitados[operacao] / quantidade if quantidade else 0.0,
+                'comparacoes_por_operacao': self.comparacoes[operacao] / quantidade if quantidade else 0.0,
+            }
+        return {'operacoes': operacoes, 'rotacoes': dict(self.rotacoes), 'alocacoes': self.alocacoes}
+# Fim Classe METRICAS_AVL
+
+# Funções de leitura dos nós-objeto usadas por ARVORE_AVL.descer_pelo_dedo: (filho esquerdo, filho direito, chave)
+ACESSORES_NO = (attrgetter('esquerda'), attrgetter('direita'), attrgetter('chave'))
+
+# Início Classe do cache de busca de uma árvore (ver ARVORE_AVL.ativar_cache)
+# "entradas" guarda, para as "capacidade" chaves buscadas mais recentemente, o nó encontrado (ou a ausência da chave),
+# descartando a menos recente; "dedo" é o caminho [(nó, limite inferior, limite superior)] da última descida,
+# de onde a próxima busca é retomada (cada nó cobre as chaves em (inferior, superior), None = sem limite;
+# uma chave igual ao limite inferior está no ancestral que o definiu)
+# Inserções e remoções descartam a entrada da chave alterada e o dedo; as operações que religam a árvore descartam tudo
+class CACHE_BUSCA_AVL:
+
+    def __init__(self, capacidade=1024, dedo=False):
+        self.capacidade = capacidade
+        self.usar_dedo = dedo
+        self.entradas = OrderedDict()
+        self.dedo = []
+        self.zerar()
+
+    # Zera os contadores de acertos
+    def zerar(self):
+        self.consultas = 0
+        self.acertos = 0   # Respondidas pelas entradas, sem descida
+        self.retomadas = 0 # Descidas retomadas do dedo, sem voltar à raiz
+        self.visitados = 0 # Nós visitados nas descidas
+
+    # Descarta o que pode ter mudado com a alteração de "chave"
+    def invalidar(self, chave):
+        self.entradas.pop(chave, None)
+        self.dedo.clear()
+
+    # Descarta todas as entradas e o dedo
+    def limpar(self):
+        self.entradas.clear()
+        self.dedo.clear()
+
+    # Guarda o resultado da busca de "chave", descartando a entrada menos recente se o cache estiver cheio
+    def guardar(self, chave, no):
+        self.entradas[chave] = no
+        if len(self.entradas) > self.capacidade:
+            self.entradas.popitem(last=False)
+
+    # Retorna os contadores e as taxas de acerto (um dicionário simples, pronto para JSON)
+    def instantaneo(self):
+        descidas = self.consultas - self.acertos
+        return {
+            'consultas': self.consultas,
+            'acertos': self.acertos,
+            'taxa_acerto': self.acertos / self.consultas if self.consultas else 0.0,
+            'retomadas_dedo': self.retomadas,
+            'taxa_retomada_dedo': self.retomadas / descidas if descidas else 0.0,
+            'visitados_por_descida': self.visitados / descidas if descidas else 0.0,
+            'entradas': len(self.entradas),
+            'capacidade': self.capacidade,
+        }
+# Fim Classe CACHE_BUSCA_AVL
+
+# Monoide usado nos agregados dos nós (ver ARVORE_AVL.aggregate)
+# identidade: resultado de um intervalo vazio; combinar(a, b): junta os resumos de dois trechos consecutivos
+# (deve ser associativa, mas não precisa ser comutativa); medir(valor, dado): resumo de um único nó
+def medir_valor(valor, dado):
+    return valor
+
+MONOIDE_AVL = namedtuple('MONOIDE_AVL', ['identidade', 'combinar', 'medir'], defaults=(medir_valor,))
+
+MONOIDE_SOMA = MONOIDE_AVL(0, lambda a, b: a + b)
+MONOIDE_MINIMO = MONOIDE_AVL(float('inf'), min)
+MONOIDE_MAXIMO = MONOIDE_AVL(float('-inf'), max)
+# Maior fim entre os intervalos (inicio, fim) da subárvore, usado pela ARVORE_AVL_INTERVALOS
+MONOIDE_FIM_MAXIMO = MONOIDE_AVL(float('-inf'), max, lambda intervalo, dado: intervalo[1])
+
 # Início Classe que representa a própria Árvore-AVL
 class ARVORE_AVL:
 
@@ -50,6 +286,17 @@ class ARVORE_AVL:
         # Atualiza a altura de "y", que agora é o novo nó raiz
         y.altura = 1 + max(self.obter_altura(y.esquerda), self.obter_altura(y.direita))
 
+        # Com estatísticas de ordem, "y" passa a ter o tamanho que era de "x", e "x" é recalculado pelos filhos
+        if self.estatisticas_de_ordem:
+            y.tamanho = x.tamanho
+            x.tamanho = 1 + self.obter_tamanho(x.esquerda) + self.obter_tamanho(x.direita)
+
+        # Os agregados são refeitos de baixo para cima ("x" agora é filho de "y"); o de "x" não é reaproveitado
+        # como o tamanho, pois na subida após uma inserção ou remoção ele ainda não foi atualizado
+        if self.monoide is not None:
+            self.agregar_no(x)
+            self.agregar_no(y)
+
         # Retorna "y" como a nova raiz da subárvore após a rotação
         return y
 
@@ -73,226 +320,1440 @@ class ARVORE_AVL:
         # Atualiza a altura de "y", que agora é o novo nó raiz
         y.altura = 1 + max(self.obter_altura(y.esquerda), self.obter_altura(y.direita))
 
+        # Com estatísticas de ordem, "y" passa a ter o tamanho que era de "x", e "x" é recalculado pelos filhos
+        if self.estatisticas_de_ordem:
+            y.tamanho = x.tamanho
+            x.tamanho = 1 + self.obter_tamanho(x.esquerda) + self.obter_tamanho(x.direita)
+
+        # Os agregados são refeitos de baixo para cima ("x" agora é filho de "y"); o de "x" não é reaproveitado
+        # como o tamanho, pois na subida após uma inserção ou remoção ele ainda não foi atualizado
+        if self.monoide is not None:
+            self.agregar_no(x)
+            self.agregar_no(y)
+
         # Retorna "y" como a nova raiz da subárvore após a rotação
         return y
 
 
     # Construtor que inicializa a árvore e possui um parâmetro de atualização para cada mudança
-    def __init__(self, update_arvore=None, update_historico=None):
+    # Com "estatisticas_de_ordem", cada nó guarda o tamanho da sua subárvore (rank, select, count_range e len em O(log n))
+    # "key" é uma função opcional que define a chave de comparação de cada valor (como em sorted())
+    # Com um "monoide" (MONOIDE_AVL), cada nó guarda o resumo da sua subárvore, e aggregate(inicio, fim) custa O(log n)
+    # Com "mapa", cada nó guarda uma carga (arvore[chave] = dado); a primeira escrita de mapa também liga o modo
+    def __init__(self, update_arvore=None, update_historico=None, estatisticas_de_ordem=False, key=None, monoide=None,
+                 mapa=False):
         self.raiz = None # Inicialmente a raiz é iniciada como "None"
         self.update_arvore = update_arvore  # Objeto que armazena as modificações e atualiza o gráfico
         self.update_historico = update_historico # Para registrar histórico
+        self.estatisticas_de_ordem = estatisticas_de_ordem
+
+        # Buffer de eventos: permanece None enquanto não houver assinantes, e então nada é registrado
+        self.eventos = None
+        self.assinantes = []
+        self.agrupamentos = 0 # Quantos "agrupar_eventos()" estão abertos (a publicação espera o mais externo)
+
+        # "update_arvore" é chamado uma vez por publicação, e "update_historico" recebe as mensagens de rotações e lotes
+        if update_arvore:
+            self.assinar(update_arvore, modo='coalescido')
+        if update_historico:
+            self.assinar(self.repassar_historico, modo='evento')
+        self.monoide = monoide
+        self.key = key
+        self.mapa = mapa
+        # Classe usada na criação dos nós: cada nó só tem os campos que a árvore de fato mantém
+        if monoide is not None:
+            tipo_no = NO_AVL_AGREGADO_CONTADO if estatisticas_de_ordem else NO_AVL_AGREGADO
+        else:
+            tipo_no = NO_AVL_CONTADO if estatisticas_de_ordem else NO_AVL
+        self.tipo_no = classe_no(tipo_no, com_chave=key is not None, com_dado=mapa)
+
+        # Contadores de desempenho: permanecem None (uma única verificação por operação) até ativar_metricas()
+        self.metricas = None
+
+        # Cache de busca (chaves quentes e dedo): permanece None até ativar_cache()
+        self.cache = None
+        self.chave_do_no = attrgetter('chave') # Função usada para ordenar listas de nós
 
     # Funções Básicas e contidas na classe
 
     # Função de Inserção que recebe dois objetos, raiz e o valor desejado, sendo "self" o referenciador
-    def inserir(self, raiz, valor):
+    # A inserção é iterativa: o caminho percorrido é guardado em uma pilha, evitando o custo de uma chamada recursiva por nível
+    # No modo mapa, "dado" é a carga guardada no nó e, com "substituir", uma chave já existente apenas tem a carga trocada
+    # "chave" é a chave de comparação de "valor", quando quem chama já a calculou (operações em lote)
+    def inserir(self, raiz, valor, dado=None, substituir=False, chave=None):
+        if dado is not None and not self.mapa:
+            raise ValueError("Cargas exigem o modo mapa: use ARVORE_AVL(mapa=True) ou arvore[chave] = dado")
+        # A chave de comparação é calculada uma única vez e fica guardada no nó
+        if chave is None:
+            chave = self.key(valor) if self.key else valor
+        if self.cache is not None:
+            self.cache.invalidar(chave)
+
         # Caso a raiz seja nula, cria um novo nó com o valor fornecido
         if not raiz:
-            return NO_AVL(valor)
+            raiz = self.tipo_no(valor, chave, dado)
+            if self.monoide is not None:
+                self.agregar_no(raiz)
+            if self.metricas is not None:
+                self.metricas.registrar('inserir', 0, 0)
+                self.metricas.alocacoes += 1
+            if self.eventos is not None:
+                self.registrar('insercao', valor)
+            return raiz
 
-        # Insere recursivamente o valor na subárvore esquerda (se o valor for menor) ou direita (se maior) que a raiz
-        if valor < raiz.valor:
-            raiz.esquerda = self.inserir(raiz.esquerda, valor)
+        # Desce pela árvore até uma posição vazia, empilhando cada nó visitado
+        # Valores menores seguem para a esquerda, maiores (ou iguais) para a direita
+        caminho = []
+        atual = raiz
+        while atual:
+            caminho.append(atual)
+            if chave < atual.chave:
+                atual = atual.esquerda
+            elif substituir and chave == atual.chave:
+                # A chave já existe: troca o valor e a carga sem alterar a estrutura
+                atual.valor = valor
+                if self.mapa:
+                    atual.dado = dado
+                # O resumo do nó mudou, então os agregados do caminho são refeitos de baixo para cima
+                if self.monoide is not None:
+                    for no in reversed(caminho):
+                        self.agregar_no(no)
+                if self.metricas is not None:
+                    self.metricas.registrar('inserir', len(caminho), 2 * len(caminho))
+                if self.eventos is not None:
+                    self.registrar('atualizacao', valor)
+                return raiz
+            else:
+                atual = atual.direita
+
+        # Cada nó visitado custou uma comparação "<" (e uma "==", com "substituir"), mais a escolha do lado no pai
+        if self.metricas is not None:
+            self.metricas.registrar('inserir', len(caminho), (2 if substituir else 1) * len(caminho) + 1)
+            self.metricas.alocacoes += 1
+
+        # Todos os nós do caminho ganham um descendente
+        if self.estatisticas_de_ordem:
+            for no in caminho:
+                no.tamanho += 1
+
+        # Pendura o novo nó no último nó do caminho (seu pai)
+        novo = self.tipo_no(valor, chave, dado)
+        if self.monoide is not None:
+            self.agregar_no(novo)
+        pai = caminho[-1]
+        if chave < pai.chave:
+            pai.esquerda = novo
         else:
-            raiz.direita = self.inserir(raiz.direita, valor)
+            pai.direita = novo
 
-        # Atualiza a altura do nó atual com base nos filhos
-        raiz.altura = 1 + max(self.obter_altura(raiz.esquerda), self.obter_altura(raiz.direita))
-        
-        # Calcula o fator de balanceamento para o nó atual
-        balanceamento = self.obter_balanceamento(raiz)
+        # Sobe pelo caminho atualizando alturas e realizando as rotações necessárias
+        raiz = self.rebalancear_caminho(raiz, caminho)
 
-        # Atualiza o gráfico após a mudança
-        if self.update_arvore:
-            self.update_arvore() 
+        # Registra o evento (uma única verificação por operação, nenhuma por nível)
+        if self.eventos is not None:
+            self.registrar('insercao', valor)
+        return raiz
 
-        # Rotação simples à direita, se desbalanceado para a esquerda
-        if balanceamento > 1 and valor < raiz.esquerda.valor:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação simples à direita do nó {raiz.valor}")
-                
-            raiz = self.rotacionar_direita(raiz)
+    # Função de Remoção que recebe a raiz e o valor a ser removido, retornando a nova raiz
+    # Assim como a inserção, é iterativa e o sucessor é obtido na mesma descida (sem uma segunda remoção recursiva)
+    def remover(self, raiz, valor):
+        chave = self.key(valor) if self.key else valor
+        if self.cache is not None:
+            self.cache.invalidar(chave)
 
-            # Atualiza o gráfico após a mudança
-            if self.update_arvore:
-                self.update_arvore()
+        # Desce pela árvore procurando o nó, empilhando os nós visitados
+        caminho = []
+        atual = raiz
+        while atual and chave != atual.chave:
+            caminho.append(atual)
+            atual = atual.esquerda if chave < atual.chave else atual.direita
 
-            return raiz
+        # Cada nó do caminho custou as comparações "!=" e "<", e o nó encontrado uma "!="
+        if self.metricas is not None:
+            encontrado = 1 if atual else 0
+            self.metricas.registrar('remover', len(caminho) + encontrado, 2 * len(caminho) + encontrado)
 
-        # Rotação simples à esquerda, se desbalanceado para a direita
-        if balanceamento < -1 and valor > raiz.direita.valor:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação simples à esquerda do nó {raiz.valor}")
-        
-            raiz = self.rotacionar_esquerda(raiz)
+        # Caso o nó não for encontrado
+        if not atual:
+            # Registra que o valor não foi encontrado
+            if self.eventos is not None:
+                self.registrar('nao_encontrado', valor)
+            return raiz # Retorna a raiz inalterada
+
+        # Caso 2: Nó com dois filhos
+        if atual.esquerda and atual.direita:
+            # Continua a descida até o menor valor da subárvore direita (sucessor), ainda empilhando o caminho
+            caminho.append(atual)
+            sucessor = atual.direita
+            while sucessor.esquerda:
+                caminho.append(sucessor)
+                sucessor = sucessor.esquerda
+
+            # Substitui o valor (e a chave e a carga) do nó atual pelo sucessor mais próximo
+            # (a entrada do sucessor no cache aponta para o nó que sai da árvore)
+            if self.cache is not None:
+                self.cache.invalidar(sucessor.chave)
+            atual.valor, atual.chave = sucessor.valor, sucessor.chave
+            if self.mapa:
+                atual.dado = sucessor.dado
+            removido, substituto = sucessor, sucessor.direita # O sucessor é quem sai fisicamente da árvore
+        else:
+            # Caso 1: Nó com apenas um filho ou nenhum, que é substituído pelo filho existente (ou None)
+            removido, substituto = atual, atual.esquerda or atual.direita
+
+        # Se o nó removido era a própria raiz, o substituto passa a ser a raiz (não há o que balancear)
+        if not caminho:
+            if self.eventos is not None:
+                self.registrar('remocao', valor)
+            return substituto
+
+        # Todos os nós do caminho perdem um descendente
+        if self.estatisticas_de_ordem:
+            for no in caminho:
+                no.tamanho -= 1
+
+        # Desliga o nó removido do seu pai
+        pai = caminho[-1]
+        if pai.esquerda is removido:
+            pai.esquerda = substituto
+        else:
+            pai.direita = substituto
 
-            # Atualiza o gráfico após a mudança
-            if self.update_arvore:
-                self.update_arvore()
+        # Sobe pelo caminho atualizando alturas e realizando as rotações necessárias
+        raiz = self.rebalancear_caminho(raiz, caminho)
 
-            return raiz
+        if self.eventos is not None:
+            self.registrar('remocao', valor)
+        return raiz
 
-        # Rotação dupla (esquerda - direita), se desbalanceado para a esquerda
-        if balanceamento > 1 and valor > raiz.esquerda.valor:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação dupla (Esquerda-Direita) sobre o nó: {raiz.valor}")
+    # Função que percorre o caminho (do fim para o início) após uma inserção ou remoção
+    # A subida é interrompida assim que a altura de uma subárvore deixa de mudar, pois dali para cima nada mais se altera
+    def rebalancear_caminho(self, raiz, caminho):
+        for i in range(len(caminho) - 1, -1, -1):
+            no = caminho[i]
+            altura_anterior = no.altura
+
+            # Atualiza a altura do nó atual com base nos filhos
+            esquerda, direita = no.esquerda, no.direita
+            altura_esquerda = esquerda.altura if esquerda else 0
+            altura_direita = direita.altura if direita else 0
+            no.altura = 1 + (altura_esquerda if altura_esquerda > altura_direita else altura_direita)
+
+            # Calcula o fator de balanceamento e, se necessário, balanceia a subárvore
+            balanceamento = altura_esquerda - altura_direita
+            if balanceamento > 1 or balanceamento < -1:
+                nova = self.balancear(no, balanceamento)
+
+                # Reconecta a nova raiz da subárvore ao seu pai (ou à árvore)
+                if i == 0:
+                    raiz = nova
+                elif caminho[i - 1].esquerda is no:
+                    caminho[i - 1].esquerda = nova
+                else:
+                    caminho[i - 1].direita = nova
+                no = nova
+            elif self.monoide is not None:
+                self.agregar_no(no)
+
+            # Se a altura da subárvore não mudou, as alturas dos ancestrais permanecem iguais
+            # (mas os seus agregados ainda mudam, e são refeitos até a raiz)
+            if no.altura == altura_anterior:
+                if self.monoide is not None:
+                    for j in range(i - 1, -1, -1):
+                        self.agregar_no(caminho[j])
+                break
 
-            # Realiza a sub-rotação esquerda
-            raiz.esquerda = self.rotacionar_esquerda(raiz.esquerda)
-            
-            # Atualiza o gráfico após a mudança
-            if self.update_arvore:
-                self.update_arvore()
-                
-            # Realiza a rotação direita
-            raiz = self.rotacionar_direita(raiz)
-            
-            # Atualiza o gráfico após a mudança
-            if self.update_arvore:
-                self.update_arvore()
-            return raiz
+        return raiz
 
-        # Rotação dupla (direita - esquerda), se desbalanceado para a direita
-        if balanceamento < -1 and valor < raiz.direita.valor:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação dupla (Direita-Esquerda) sobre o nó: {raiz.valor}")
-                
-            # Realiza a sub-rotação direita
-            raiz.direita = self.rotacionar_direita(raiz.direita)
-            
-            # Atualiza o gráfico após a mudança
-            if self.update_arvore:
-                self.update_arvore()  # Atualiza após a sub-rotação
+    # Função que aplica a rotação adequada a um nó desbalanceado, retornando a nova raiz da subárvore
+    def balancear(self, raiz, balanceamento):
+        pivo = raiz.valor
 
-            # Rotação esquerda
-            raiz = self.rotacionar_esquerda(raiz)
-            
-            # Atualiza o gráfico após a mudança
-            if self.update_arvore:
-                self.update_arvore()
-                
-            return raiz
-        # Fim Balanceamentos
+        # Desbalanceado para a esquerda
+        if balanceamento > 1:
+            # Rotação simples à direita
+            if self.obter_balanceamento(raiz.esquerda) >= 0:
+                rotacao = 'direita'
+                raiz = self.rotacionar_direita(raiz)
+            else:
+                # Rotação dupla (esquerda - direita): sub-rotação esquerda e então a rotação direita
+                rotacao = 'esquerda_direita'
+                raiz.esquerda = self.rotacionar_esquerda(raiz.esquerda)
+                raiz = self.rotacionar_direita(raiz)
+
+        # Desbalanceado para a direita
+        else:
+            # Rotação simples à esquerda
+            if self.obter_balanceamento(raiz.direita) <= 0:
+                rotacao = 'esquerda'
+                raiz = self.rotacionar_esquerda(raiz)
+            else:
+                # Rotação dupla (direita - esquerda): sub-rotação direita e então a rotação esquerda
+                rotacao = 'direita_esquerda'
+                raiz.direita = self.rotacionar_direita(raiz.direita)
+                raiz = self.rotacionar_esquerda(raiz)
+
+        # Acumula o evento da rotação, publicado junto com o evento da operação que a causou
+        if self.eventos is not None:
+            self.eventos.append(EVENTO_AVL('rotacao', rotacao=rotacao, pivo=pivo))
+        if self.metricas is not None:
+            self.metricas.rotacoes[rotacao] += 1
 
+        # Fim Balanceamentos
         return raiz
 
-    def remover(self, raiz, valor):
-        # Caso o nó não for encontrado
-        if not raiz:
-            # Atualiza o histórico indicando que o valor não foi encontrado
-            if self.update_historico:
-                self.update_historico(f"Valor {valor} não encontrado para remoção!")
-            return None # Retorna a raiz inalterada
- 
-        # Busca o valor a ser removido na subárvore esquerda, se o valor for menor que o atual
-        if valor < raiz.valor:
-            raiz.esquerda = self.remover(raiz.esquerda, valor)
-
-        elif valor > raiz.valor: # Ou na direita, se o valor for maior que o atual
-            raiz.direita = self.remover(raiz.direita, valor)
-        
-        else: # Contudo, se, o nó a ser removido foi encontrado
-            
-            # Caso 1: Nó com apenas um filho ou nenhum
-            if not raiz.esquerda: # Se não houver subárvore esquerda
-                return raiz.direita # Retorna a subárvore direita (ou None se não houver, como padrão)
-            
-            elif not raiz.direita: # se não houver subárvore direita
-                return raiz.esquerda  # Retorna a subárvore esquerda
+    #Função de busca (iterativa)
+    def buscar(self, raiz, valor):
+        # Com o cache ou as métricas ativos, a busca passa pela versão que os usa
+        if self.cache is not None:
+            return self.buscar_em_cache(raiz, valor) is not None
+        if self.metricas is not None:
+            return self.buscar_medido(raiz, valor) is not None
 
-            # Caso 2: Nó com dois filhos
-            # Encontra o menor valor da subárvore direita (substituto para o nó a ser removido)
-            menor_valor = self.obter_minimo(raiz.direita)
-            
-            raiz.valor = menor_valor.valor # Substitui o valor do nó atual pelo sucessor mais próximo
-            raiz.direita = self.remover(raiz.direita, menor_valor.valor) # Remove o nó sucessor na subárvore direita
+        chave = self.key(valor) if self.key else valor
+        atual = raiz
+        while atual:
+            # Se o valor do nó atual for igual ao valor buscado, retorna True
+            if chave == atual.chave:
+                return True
 
-        # Atualiza a altura do nó atual após a remoção
-        raiz.altura = 1 + max(self.obter_altura(raiz.esquerda), self.obter_altura(raiz.direita))
+            # Senão, continua pela subárvore esquerda (valor menor) ou direita (valor maior)
+            atual = atual.esquerda if chave < atual.chave else atual.direita
 
-        # Verifica o balanceamento do nó atual para determinar se é necessário algum ajuste na arvore
-        balanceamento = self.obter_balanceamento(raiz)
+        # Chegou a um nó None, então o valor não está presente na árvore
+        return False
 
-        # Se caso for necessário:
-        
-        # Rotação simples à direita (desbalanceamento à esquerda)
-        if balanceamento > 1 and self.obter_balanceamento(raiz.esquerda) > 0:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação simples à direita do nó: {raiz.valor}")
-            
-            # Realiza a rotação simples
-            return self.rotacionar_direita(raiz)
-        
-        # Rotação dupla (esquerda - direita) (desbalanceamento à esquerda)
-        if balanceamento > 1 and self.obter_balanceamento(raiz.esquerda) < 0:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação dupla (Esquerda-Direita) sobre o nó: {raiz.valor}")
+    # Função de busca que retorna o próprio nó encontrado (ou None), usada pelo modo mapa
+    def buscar_no(self, raiz, valor):
+        if self.cache is not None:
+            return self.buscar_em_cache(raiz, valor)
+        if self.metricas is not None:
+            return self.buscar_medido(raiz, valor)
 
-            # Realiza a rotação esquerda na subárvore esquerda
-            raiz.esquerda = self.rotacionar_esquerda(raiz.esquerda)
-            
-            # Realiza a rotação direita no nó atual
-            return self.rotacionar_direita(raiz)
-        
-        # Rotação simples à esquerda (desbalanceamento à direita)
-        if balanceamento < -1 and self.obter_balanceamento(raiz.direita) < 0:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação simples à esquerda do nó: {raiz.valor}")
-            
-            # Realiza a rotação simples
-            return self.rotacionar_esquerda(raiz)
-        
-        # Rotação dupla (direita - esquerda) (desbalanceamento à direita)
-        if balanceamento < -1 and self.obter_balanceamento(raiz.direita) > 0:
-            
-            # Atualiza o histórico
-            if self.update_historico:
-                self.update_historico(f"Rotação dupla (Direita-Esquerda) sobre o nó: {raiz.valor}")
+        chave = self.key(valor) if self.key else valor
+        atual = raiz
+        while atual:
+            if chave == atual.chave:
+                return atual
+            atual = atual.esquerda if chave < atual.chave else atual.direita
+        return None
+
+    # Busca equivalente a buscar_no, que contabiliza nas métricas os nós visitados e as comparações feitas
+    def buscar_medido(self, raiz, valor):
+        chave = self.key(valor) if self.key else valor
+        visitados = comparacoes = 0
+        atual = raiz
+        while atual:
+            visitados += 1
+            comparacoes += 1
+            if chave == atual.chave:
+                break
+            comparacoes += 1
+            atual = atual.esquerda if chave < atual.chave else atual.direita
+        self.metricas.registrar('buscar', visitados, comparacoes)
+        return atual
 
-            # Realiza a rotação direita na subárvore direita
-            raiz.direita = self.rotacionar_direita(raiz.direita)
-            
-            # Realiza a rotação esquerda no nó atual
-            return self.rotacionar_esquerda(raiz)
+    # Busca equivalente a buscar_no que consulta o cache e, em uma falta, desce a partir do dedo
+    # As entradas valem apenas para a árvore atual (self.raiz); outras raízes (versões antigas, resultados de split...)
+    # são buscadas sem elas, apenas com o dedo
+    def buscar_em_cache(self, raiz, valor):
+        chave = self.key(valor) if self.key else valor
+        cache = self.cache
+        cache.consultas += 1
+
+        entradas = cache.entradas
+        usar_entradas = cache.capacidade > 0 and raiz is self.raiz
+        if usar_entradas:
+            no = entradas.get(chave, entradas) # O próprio dicionário marca a ausência de entrada
+            if no is not entradas:
+                cache.acertos += 1
+                entradas.move_to_end(chave)
+                if self.metricas is not None:
+                    self.metricas.registrar('buscar', 0, 0)
+                return no
+
+        no = self.descer_pelo_dedo(raiz, chave)
+        if usar_entradas:
+            cache.guardar(chave, no)
+        return no
+
+    # Busca pela chave a partir do dedo, deixando nele o caminho percorrido, e retorna o nó encontrado (ou None)
+    # Retoma do nó mais fundo do dedo cuja faixa contém a chave (o ancestral comum com a descida anterior) e desce
+    # dali, visitando apenas os níveis abaixo dele. O ganho depende de onde esse ancestral está, não da distância
+    # entre as chaves: duas chaves vizinhas em lados opostos da raiz ainda custam O(log n); já uma varredura inteira
+    # em ordem crescente desce O(n) níveis no total, O(1) amortizado por busca (mais a busca binária no dedo)
+    # Os nós são lidos pelos acessores de acessores_no(), então a mesma descida serve à ARVORE_AVL_COMPACTA
+    def descer_pelo_dedo(self, raiz, chave):
+        filho_esquerdo, filho_direito, chave_do_no = self.acessores_no()
+        cache = self.cache
+        if not cache.usar_dedo:
+            # Sem o dedo, é a descida comum a partir da raiz
+            visitados = 0
+            atual = raiz
+            while atual:
+                visitados += 1
+                chave_no = chave_do_no(atual)
+                if chave == chave_no:
+                    break
+                atual = filho_esquerdo(atual) if chave < chave_no else filho_direito(atual)
+        else:
+            dedo = cache.dedo
+            if dedo and dedo[0][0] is raiz:
+                # As faixas do dedo são aninhadas (a da raiz não tem limites), então o nó mais fundo cuja faixa
+                # contém a chave é localizado por busca binária, e o dedo é cortado logo abaixo dele
+                _, inferior, superior = dedo[-1]
+                if not ((inferior is None or inferior < chave) and (superior is None or chave < superior)):
+                    baixo, alto = 0, len(dedo) - 1
+                    while alto - baixo > 1:
+                        meio = (baixo + alto) // 2
+                        _, inferior, superior = dedo[meio]
+                        if (inferior is None or inferior < chave) and (superior is None or chave < superior):
+                            baixo = meio
+                        else:
+                            alto = meio
+                    del dedo[baixo + 1:]
+                if len(dedo) > 1:
+                    cache.retomadas += 1
+                atual, inferior, superior = dedo[-1]
+            else:
+                dedo.clear()
+                atual, inferior, superior = raiz, None, None
+                if raiz:
+                    dedo.append((raiz, None, None))
+
+            # Mesma regra de descida da busca comum (valores iguais seguem para a direita), empilhando as faixas
+            inicio = len(dedo)
+            while atual:
+                chave_no = chave_do_no(atual)
+                if chave == chave_no:
+                    break
+                if chave < chave_no:
+                    atual, superior = filho_esquerdo(atual), chave_no
+                else:
+                    atual, inferior = filho_direito(atual), chave_no
+                if atual:
+                    dedo.append((atual, inferior, superior))
+            visitados = len(dedo) - inicio + 1 if raiz else 0
+
+        # Cada nó visitado custou uma comparação "==" e, exceto o encontrado, uma "<"
+        cache.visitados += visitados
+        if self.metricas is not None:
+            self.metricas.registrar('buscar', visitados, 2 * visitados - (1 if atual else 0))
+        return atual
 
-        # Fim Balanceamentos
-            
-        return raiz
-        
-    #Função de busca
-    def buscar(self, raiz, valor):
-        # Se a raiz for None, o valor não está presente na árvore, então False
-        if raiz is None:
-            return False
-        
-        # Se o valor do nó atual for igual ao valor buscado, retorna True
-        if valor == raiz.valor:
+    # Função auxiliar que retorna as funções (filho esquerdo, filho direito, chave) de leitura dos nós
+    def acessores_no(self):
+        return ACESSORES_NO
+
+    # Funções de Mapa (sobre self.raiz): cada chave guarda uma carga ("dado") no próprio nó
+
+    # Função que liga o modo mapa: a árvore é reconstruída uma única vez com nós que têm o campo "dado"
+    # Chamada pelas escritas de mapa (arvore[chave] = dado, setdefault e atualizar_lote) quando o modo ainda está desligado
+    def ativar_mapa(self):
+        if self.mapa:
+            return
+        self.mapa = True
+        self.tipo_no = classe_no(self.tipo_no, com_dado=True)
+        if self.raiz:
+            self.raiz = self.reconstruir([self.tipo_no(no.valor, no.chave) for no in self.listar_nos(self.raiz)])
+
+    # arvore[chave] = dado, inserindo a chave ou trocando a carga de uma chave já existente
+    def __setitem__(self, chave, dado):
+        if not self.mapa:
+            self.ativar_mapa()
+        self.raiz = self.inserir(self.raiz, chave, dado, substituir=True)
+
+    # arvore[chave], em uma única descida (KeyError se a chave não existir)
+    def __getitem__(self, chave):
+        no = self.buscar_no(self.raiz, chave)
+        if no is None:
+            raise KeyError(chave)
+        return no.dado
+
+    # del arvore[chave] (KeyError se a chave não existir)
+    def __delitem__(self, chave):
+        self.pop(chave)
+
+    # chave in arvore
+    def __contains__(self, chave):
+        return self.buscar(self.raiz, chave)
+
+    # Retorna a carga da chave, ou "padrao" se a chave não existir
+    def get(self, chave, padrao=None):
+        no = self.buscar_no(self.raiz, chave)
+        return padrao if no is None else no.dado
+
+    # Remove a chave e retorna a sua carga; sem "padrao", uma chave inexistente gera KeyError
+    def pop(self, chave, *padrao):
+        no = self.buscar_no(self.raiz, chave)
+        if no is None:
+            if padrao:
+                return padrao[0]
+            raise KeyError(chave)
+
+        dado = no.dado
+        self.raiz = self.remover(self.raiz, chave)
+        return dado
+
+    # Retorna a carga da chave; se a chave não existir, insere-a com "padrao" e retorna "padrao"
+    def setdefault(self, chave, padrao=None):
+        no = self.buscar_no(self.raiz, chave)
+        if no is not None:
+            return no.dado
+        if not self.mapa:
+            self.ativar_mapa()
+        self.raiz = self.inserir(self.raiz, chave, padrao)
+        return padrao
+
+    # Funções de Eventos
+
+    # Função que registra um assinante dos eventos da árvore. Modos de entrega, a cada publicação:
+    # 'evento': callback(evento) para cada evento; 'lote': callback(lista_de_eventos); 'coalescido': callback() uma única vez
+    def assinar(self, callback, modo='lote'):
+        if modo not in ('evento', 'lote', 'coalescido'):
+            raise ValueError(f"Modo de assinatura inválido: {modo}")
+        self.assinantes.append((callback, modo))
+        if self.eventos is None:
+            self.eventos = []
+
+    # Função que remove um assinante; sem assinantes, o registro de eventos é desligado
+    def cancelar_assinatura(self, callback):
+        self.assinantes = [(c, modo) for c, modo in self.assinantes if c != callback]
+        if not self.assinantes:
+            self.eventos = None
+
+    # Função que acrescenta o evento de uma operação ao buffer e publica (se não houver agrupamento aberto)
+    def registrar(self, tipo, chave=None, quantidade=1):
+        self.eventos.append(EVENTO_AVL(tipo, chave, quantidade=quantidade))
+        if not self.agrupamentos:
+            self.publicar()
+
+    # Função que entrega os eventos acumulados aos assinantes e esvazia o buffer
+    def publicar(self):
+        eventos = self.eventos
+        if not eventos:
+            return
+        self.eventos = []
+
+        for callback, modo in self.assinantes:
+            if modo == 'evento':
+                for evento in eventos:
+                    callback(evento)
+            elif modo == 'lote':
+                callback(eventos)
+            else:
+                callback()
+
+    # Gerenciador de contexto que acumula os eventos de várias operações e os publica juntos ao final
+    # Útil também quando a raiz é atribuída pelo chamador: a publicação só ocorre depois da atribuição
+    @contextmanager
+    def agrupar_eventos(self):
+        self.agrupamentos += 1
+        try:
+            yield
+        finally:
+            self.agrupamentos -= 1
+            if not self.agrupamentos and self.eventos:
+                self.publicar()
+
+    # Assinante que converte os eventos de rotação, de remoção sem sucesso e de lotes nas mensagens do histórico
+    def repassar_historico(self, evento):
+        if evento.tipo == 'rotacao':
+            self.update_historico(MENSAGENS_ROTACAO[evento.rotacao].format(evento.pivo))
+        elif evento.tipo == 'nao_encontrado':
+            self.update_historico(f"Valor {evento.chave} não encontrado para remoção!")
+        elif evento.tipo == 'carga':
+            self.update_historico(f"Carga em lote de {evento.quantidade} valores")
+        elif evento.tipo == 'insercao_lote':
+            self.update_historico(f"Inserção em lote de {evento.quantidade} valores")
+        elif evento.tipo == 'remocao_lote':
+            self.update_historico(f"Remoção em lote de {evento.quantidade} valores")
+
+    # Funções de Carga em Lote
+
+    # Função que cria uma árvore já preenchida e perfeitamente balanceada a partir de um iterável de valores
+    # Os demais parâmetros são repassados ao construtor (ex.: update_historico)
+    @classmethod
+    def from_sorted(cls, valores, manter_duplicados=False, **parametros):
+        arvore = cls(**parametros)
+        arvore.bulk_load(valores, manter_duplicados)
+        return arvore
+
+    # Função que substitui o conteúdo da árvore por "valores", construindo-a em tempo linear
+    # Se os valores não estiverem ordenados, são ordenados uma única vez antes da construção
+    def bulk_load(self, valores, manter_duplicados=False):
+        self.limpar()
+        nos = self.ordenar_nos(self.novos_nos(valores), manter_duplicados)
+        self.raiz = self.reconstruir(nos)
+
+        # Um único evento para a carga inteira
+        if self.eventos is not None:
+            self.registrar('carga', quantidade=len(nos))
+
+        return self.raiz
+
+    # Função que insere um lote de valores na árvore (self.raiz), ordenando o lote uma única vez
+    # Lotes grandes em relação à árvore são mesclados aos nós existentes e a árvore é reconstruída;
+    # os demais são inseridos um a um, em ordem, sem disparar os callbacks a cada nível
+    # (a união por divisão e junção não é usada aqui: ela supõe chaves únicas, e o lote pode repetir chaves da árvore)
+    def inserir_lote(self, valores):
+        lote, chaves = self.ordenar_lote(valores)
+        if not lote:
+            return self.raiz
+
+        if self.vale_reconstruir(len(lote)):
+            # Mescla (o "sort" do Python aproveita as duas sequências já ordenadas) e reconstrói
+            # Os nós existentes são reaproveitados, preservando as cargas e as chaves já calculadas
+            nos = self.reutilizar_nos(self.listar_nos(self.raiz))
+            nos.extend(self.novos_nos(lote, chaves))
+            nos.sort(key=self.chave_do_no)
+            self.raiz = self.reconstruir(nos)
+        else:
+            raiz = self.raiz
+            with self.eventos_suspensos():
+                if self.key:
+                    for valor, chave in zip(lote, chaves):
+                        raiz = self.inserir(raiz, valor, chave=chave)
+                else:
+                    for valor in lote:
+                        raiz = self.inserir(raiz, valor)
+            self.raiz = raiz
+
+        # Um único evento para o lote inteiro
+        if self.eventos is not None:
+            self.registrar('insercao_lote', quantidade=len(lote))
+
+        return self.raiz
+
+    # Função que grava um lote de pares (valor, dado) no modo mapa (self.raiz), como "arvore[valor] = dado" para cada par
+    # Com chaves repetidas no lote, vale o último par; a escolha entre reconstruir e inserir um a um é a da inserção em lote
+    def atualizar_lote(self, pares):
+        # A chave de cada valor é calculada uma única vez, aqui, e repassada aos nós e às inserções
+        lote = {}
+        for valor, dado in pares:
+            lote[self.key(valor) if self.key else valor] = (valor, dado)
+        if not lote:
+            return self.raiz
+        if not self.mapa:
+            self.ativar_mapa()
+        quantidade = len(lote) # A reconstrução esvazia "lote" à medida que encontra as chaves já presentes
+
+        if self.vale_reconstruir(quantidade):
+            # As chaves já presentes ganham um nó novo (os antigos podem pertencer a outras versões, na árvore persistente)
+            mantidos, novos = [], []
+            for no in self.listar_nos(self.raiz):
+                par = lote.pop(no.chave, None)
+                if par is None:
+                    mantidos.append(no)
+                else:
+                    novos.append(self.novo_no(*par, chave=no.chave))
+            novos.extend(self.novo_no(valor, dado, chave) for chave, (valor, dado) in lote.items())
+            nos = self.reutilizar_nos(mantidos)
+            nos.extend(novos)
+            nos.sort(key=self.chave_do_no)
+            self.raiz = self.reconstruir(nos)
+        else:
+            raiz = self.raiz
+            with self.eventos_suspensos():
+                for chave in sorted(lote):
+                    valor, dado = lote[chave]
+                    raiz = self.inserir(raiz, valor, dado, substituir=True, chave=chave)
+            self.raiz = raiz
+
+        if self.eventos is not None:
+            self.registrar('insercao_lote', quantidade=quantidade)
+
+        return self.raiz
+
+    # Função que remove um lote de valores da árvore (self.raiz), com a mesma escolha de estratégia da inserção
+    # Cada ocorrência no lote remove uma ocorrência na árvore, assim como chamadas sucessivas a remover()
+    # Se a lista "removidos" for informada, recebe os valores do lote que foram encontrados e removidos
+    def remover_lote(self, valores, removidos=None):
+        lote, chaves = self.ordenar_lote(valores)
+        if not lote:
+            return self.raiz
+
+        if self.vale_reconstruir(len(lote)):
+            # Percorre as duas listas ordenadas em paralelo, descartando os nós presentes no lote
+            chave_do_no = self.chave_do_no
+            restantes = []
+            j = 0
+            for no in self.listar_nos(self.raiz):
+                chave = chave_do_no(no)
+                while j < len(chaves) and chaves[j] < chave:
+                    j += 1
+                if j < len(chaves) and chaves[j] == chave:
+                    if removidos is not None:
+                        removidos.append(lote[j])
+                    j += 1
+                    self.descartar_no(no)
+                else:
+                    restantes.append(no)
+            self.raiz = self.reconstruir(self.reutilizar_nos(restantes))
+        else:
+            raiz = self.raiz
+            with self.eventos_suspensos():
+                for valor in lote:
+                    if removidos is None:
+                        raiz = self.remover(raiz, valor)
+                    elif self.estatisticas_de_ordem:
+                        # O tamanho da raiz diz, sem uma segunda descida, se a remoção encontrou o valor
+                        tamanho = self.obter_tamanho(raiz)
+                        raiz = self.remover(raiz, valor)
+                        if self.obter_tamanho(raiz) < tamanho:
+                            removidos.append(valor)
+                    elif self.buscar(raiz, valor):
+                        removidos.append(valor)
+                        raiz = self.remover(raiz, valor)
+            self.raiz = raiz
+
+        if self.eventos is not None:
+            self.registrar('remocao_lote', quantidade=len(lote))
+
+        return self.raiz
+
+    # Função auxiliar que ordena um lote pela chave, calculando a chave de cada valor uma única vez
+    # Retorna as listas (valores, chaves) em ordem crescente de chave; sem função key, as duas são a mesma lista
+    def ordenar_lote(self, valores):
+        if not self.key:
+            lote = sorted(valores)
+            return lote, lote
+        pares = sorted(((self.key(valor), valor) for valor in valores), key=itemgetter(0))
+        return [valor for _, valor in pares], [chave for chave, _ in pares]
+
+    # Função auxiliar que decide entre reconstruir a árvore ou aplicar o lote valor a valor
+    # Aplicar o lote custa cerca de "tamanho do lote x altura" descidas; reconstruir custa um nó criado por valor,
+    # o que equivale (medido) a umas seis descidas de nível
+    def vale_reconstruir(self, tamanho_lote):
+        altura = self.obter_altura(self.raiz)
+        if not altura:
             return True
-    
-        # Determina em qual lado da árvore a busca continuará
-        if valor < raiz.valor:
-            # Se o valor buscado é menor que o valor do nó atual, então busca na subárvore esquerda
-            return self.buscar(raiz.esquerda, valor)
+        return tamanho_lote * altura > 6 * (self.estimar_tamanho() + tamanho_lote)
+
+    # Função auxiliar que estima a quantidade de nós a partir da altura da raiz (exata com estatísticas de ordem)
+    # Uma árvore AVL de altura "h" tem entre fib(h + 2) - 1 e 2^h - 1 nós, a estimativa usa 2^(h - 1)
+    def estimar_tamanho(self):
+        if self.estatisticas_de_ordem:
+            return self.obter_tamanho(self.raiz)
+        return 1 << (self.obter_altura(self.raiz) - 1)
+
+    # Função auxiliar que retorna os valores da subárvore em ordem crescente (percurso iterativo com pilha)
+    def listar_em_ordem(self, raiz):
+        return [no.valor for no in self.listar_nos(raiz)]
+
+    # Função auxiliar que retorna os nós da subárvore em ordem crescente (percurso iterativo com pilha)
+    def listar_nos(self, raiz):
+        nos = []
+        pilha = []
+        atual = raiz
+        while pilha or atual:
+            while atual:
+                pilha.append(atual)
+                atual = atual.esquerda
+            atual = pilha.pop()
+            nos.append(atual)
+            atual = atual.direita
+        return nos
+
+    # Função auxiliar que cria um nó solto (fora da árvore) para o valor, já com a sua chave calculada
+    # (ou com "chave", se quem chama já a calculou)
+    def novo_no(self, valor, dado=None, chave=None):
+        if chave is None:
+            chave = self.key(valor) if self.key else valor
+        return self.tipo_no(valor, chave, dado)
+
+    # Função auxiliar que cria uma lista de nós soltos, um para cada valor (com as chaves já calculadas, se recebidas)
+    def novos_nos(self, valores, chaves=None):
+        if chaves is None:
+            nos = [self.novo_no(valor) for valor in valores]
         else:
-            # Senão, o valor buscado é maior que o valor do nó atual, então busca na subárvore direita
-            return self.buscar(raiz.direita, valor)
-        
-    
+            nos = list(map(self.tipo_no, valores, chaves))
+        if self.metricas is not None:
+            self.metricas.alocacoes += len(nos)
+        return nos
+
+    # Função auxiliar chamada para cada nó que sai da árvore nas operações em lote (nada a fazer com objetos)
+    def descartar_no(self, no):
+        pass
+
+    # Função auxiliar que esvazia a árvore antes de uma carga completa
+    def limpar(self):
+        self.raiz = None
+
+    # Função auxiliar que ordena os nós pela chave (uma única verificação linear se já estiverem ordenados)
+    # e, se pedido, descarta os nós de chave repetida
+    def ordenar_nos(self, nos, manter_duplicados=False):
+        chave_do_no = self.chave_do_no
+        nos.sort(key=chave_do_no)
+
+        # Remove os duplicados (a lista já está ordenada, então basta comparar com o anterior)
+        if not manter_duplicados and nos:
+            unicos = [nos[0]]
+            for no in nos:
+                if chave_do_no(unicos[-1]) < chave_do_no(no):
+                    unicos.append(no)
+                elif no is not unicos[-1]:
+                    self.descartar_no(no)
+            nos = unicos
+
+        return nos
+
+    # Função auxiliar que constrói uma árvore balanceada a partir de uma lista ordenada de nós, retornando a raiz
+    # Todos os nós são religados, então o cache de busca é descartado
+    def reconstruir(self, nos):
+        if self.cache is not None:
+            self.cache.limpar()
+        return self.construir_balanceado(nos, 0, len(nos))
+
+    # Gerenciador de contexto que desliga o registro de eventos temporariamente (usado nas operações em lote)
+    @contextmanager
+    def eventos_suspensos(self):
+        eventos = self.eventos
+        self.eventos = None
+        try:
+            yield
+        finally:
+            self.eventos = eventos
+
+    # Função auxiliar que religa os nós de nos[inicio:fim] em uma subárvore balanceada, retornando sua raiz
+    # O elemento do meio vira a raiz, de modo que as alturas dos dois lados diferem em no máximo 1
+    def construir_balanceado(self, nos, inicio, fim):
+        if inicio >= fim:
+            return None
+
+        meio = (inicio + fim) // 2
+        no = nos[meio]
+        no.esquerda = self.construir_balanceado(nos, inicio, meio)
+        no.direita = self.construir_balanceado(nos, meio + 1, fim)
+        if self.estatisticas_de_ordem:
+            no.tamanho = fim - inicio
+        if self.monoide is not None:
+            self.agregar_no(no)
+
+        # Atualiza a altura do nó com base nos filhos já construídos
+        altura_esquerda = no.esquerda.altura if no.esquerda else 0
+        altura_direita = no.direita.altura if no.direita else 0
+        no.altura = 1 + (altura_esquerda if altura_esquerda > altura_direita else altura_direita)
+        return no
+
+    # Funções de Divisão, Junção e Conjunto (sobre raízes, como inserir e remover)
+    # Supõem chaves únicas em cada árvore. Na ARVORE_AVL, os nós das raízes recebidas são religados no resultado,
+    # então as árvores de entrada deixam de valer; na ARVORE_AVL_PERSISTENTE elas permanecem intactas
+
+    # Função que junta as árvores "raiz1" e "raiz2" com um novo nó para "valor" entre elas, retornando a nova raiz
+    # Todas as chaves de "raiz1" devem ser menores que a de "valor", e todas as de "raiz2" maiores (não é verificado)
+    def join(self, raiz1, valor, raiz2, dado=None):
+        if dado is not None and not self.mapa:
+            raise ValueError("Cargas exigem o modo mapa: use ARVORE_AVL(mapa=True) ou arvore[chave] = dado")
+        if self.cache is not None:
+            self.cache.limpar()
+        return self.juntar(raiz1, self.novo_no(valor, dado), raiz2)
+
+    # Função que divide a árvore pela chave de "valor", retornando (menores, no, maiores)
+    # "no" é o nó com a chave de "valor" (com seu valor e carga) ou None, e fica fora das duas árvores
+    def split(self, raiz, valor):
+        if self.cache is not None:
+            self.cache.limpar()
+        return self.dividir(raiz, self.key(valor) if self.key else valor)
+
+    # Funções de conjunto: retornam a raiz da união, da interseção ou da diferença (raiz1 - raiz2)
+    # Custam O(m log(n/m + 1)), sendo m o tamanho da menor árvore; com chaves repetidas, fica o nó de "raiz1"
+    def union(self, raiz1, raiz2):
+        return self.operar_conjunto('uniao', self.unir, raiz1, raiz2)
+
+    def intersection(self, raiz1, raiz2):
+        return self.operar_conjunto('intersecao', self.intersectar, raiz1, raiz2)
+
+    def difference(self, raiz1, raiz2):
+        return self.operar_conjunto('diferenca', self.subtrair, raiz1, raiz2)
+
+    # Função auxiliar que executa uma operação de conjunto registrando um único evento ao final
+    def operar_conjunto(self, operacao, funcao, raiz1, raiz2):
+        if self.cache is not None:
+            self.cache.limpar()
+        with self.eventos_suspensos():
+            raiz = funcao(raiz1, raiz2)
+        if self.eventos is not None:
+            self.registrar(operacao)
+        return raiz
+
+    # Função auxiliar que junta "esquerda", o nó "no" e "direita" em O(|diferença das alturas| + 1)
+    # O nó é pendurado na espinha da árvore mais alta, no ponto em que a altura se iguala à da mais baixa,
+    # e o caminho descido é rebalanceado como em uma inserção (as alturas sobem no máximo 1)
+    def juntar(self, esquerda, no, direita):
+        no = self.reutilizar_no(no)
+        altura_esquerda = esquerda.altura if esquerda else 0
+        altura_direita = direita.altura if direita else 0
+
+        # Alturas próximas (o caso mais comum nas operações de conjunto): o nó vira a raiz diretamente
+        if -1 <= altura_esquerda - altura_direita <= 1:
+            no.esquerda, no.direita = esquerda, direita
+            no.altura = 1 + (altura_esquerda if altura_esquerda > altura_direita else altura_direita)
+            if self.estatisticas_de_ordem:
+                no.tamanho = 1 + self.obter_tamanho(esquerda) + self.obter_tamanho(direita)
+            if self.monoide is not None:
+                self.agregar_no(no)
+            return no
+
+        caminho = []
+        if altura_esquerda > altura_direita:
+            # Desce pela espinha direita da árvore esquerda; o nó fica com a direita inteira como filho direito
+            outra, atual = direita, esquerda
+            while atual and atual.altura > altura_direita + 1:
+                atual = self.reutilizar_no(atual)
+                if caminho:
+                    caminho[-1].direita = atual
+                caminho.append(atual)
+                atual = atual.direita
+            esquerda = atual
+        else:
+            # Simétrico: desce pela espinha esquerda da árvore direita
+            outra, atual = esquerda, direita
+            while atual and atual.altura > altura_esquerda + 1:
+                atual = self.reutilizar_no(atual)
+                if caminho:
+                    caminho[-1].esquerda = atual
+                caminho.append(atual)
+                atual = atual.esquerda
+            direita = atual
+
+        no.esquerda, no.direita = esquerda, direita
+        self.atualizar_no(no)
+
+        # Pendura o nó no fim do caminho, no lugar da subárvore que virou seu filho
+        if altura_esquerda > altura_direita:
+            caminho[-1].direita = no
+        else:
+            caminho[-1].esquerda = no
+
+        # Todos os nós do caminho ganham o nó do meio e a outra árvore inteira
+        if self.estatisticas_de_ordem:
+            acrescimo = 1 + self.obter_tamanho(outra)
+            for ancestral in caminho:
+                ancestral.tamanho += acrescimo
+
+        return self.rebalancear_caminho(caminho[0], caminho)
+
+    # Função auxiliar que junta duas árvores sem nó do meio: o maior nó da esquerda é retirado e faz esse papel
+    def juntar_sem_no(self, esquerda, direita):
+        if not esquerda:
+            return direita
+        if not direita:
+            return esquerda
+
+        esquerda, ultimo = self.retirar_maior(esquerda)
+        return self.juntar(esquerda, ultimo, direita)
+
+    # Função auxiliar que desliga o maior nó da árvore, retornando (nova raiz, nó retirado)
+    # Desce apenas pela espinha direita, sem comparar chaves, e não passa pelas métricas e eventos de remover()
+    def retirar_maior(self, raiz):
+        caminho = []
+        atual = raiz
+        while atual.direita:
+            atual = self.reutilizar_no(atual)
+            if caminho:
+                caminho[-1].direita = atual
+            caminho.append(atual)
+            atual = atual.direita
+
+        # O maior nó não tem filho direito: o filho esquerdo (ou None) ocupa o seu lugar
+        if not caminho:
+            return atual.esquerda, atual
+        caminho[-1].direita = atual.esquerda
+        if self.estatisticas_de_ordem:
+            for no in caminho:
+                no.tamanho -= 1
+        return self.rebalancear_caminho(caminho[0], caminho), atual
+
+    # Função auxiliar de split(), que recebe a chave já calculada
+    # Desce até a chave e, na volta (do fundo para a raiz), junta cada nó do caminho com a sua subárvore do outro lado:
+    # as junções ficam cada vez mais altas e o custo total se telescopa em O(log n)
+    def dividir(self, raiz, chave):
+        caminho = []
+        atual = raiz
+        while atual and chave != atual.chave:
+            caminho.append(atual)
+            atual = atual.esquerda if chave < atual.chave else atual.direita
+
+        menores, maiores = (atual.esquerda, atual.direita) if atual else (None, None)
+        for no in reversed(caminho):
+            if chave < no.chave:
+                maiores = self.juntar(maiores, no, no.direita)
+            else:
+                menores = self.juntar(no.esquerda, no, menores)
+        return menores, atual, maiores
+
+    # Funções auxiliares recursivas das operações de conjunto (a profundidade é limitada pela altura da árvore menor)
+    # A raiz da árvore mais baixa divide a mais alta, e as metades são combinadas recursivamente e juntadas
+
+    def unir(self, raiz1, raiz2):
+        if not raiz1:
+            return raiz2
+        if not raiz2:
+            return raiz1
+
+        if raiz1.altura >= raiz2.altura:
+            menores, igual, maiores = self.dividir(raiz1, raiz2.chave)
+            pivo = igual or raiz2
+            esquerda, direita = self.unir(menores, raiz2.esquerda), self.unir(maiores, raiz2.direita)
+        else:
+            menores, igual, maiores = self.dividir(raiz2, raiz1.chave)
+            pivo = raiz1
+            esquerda, direita = self.unir(raiz1.esquerda, menores), self.unir(raiz1.direita, maiores)
+        return self.juntar(esquerda, pivo, direita)
+
+    def intersectar(self, raiz1, raiz2):
+        if not raiz1 or not raiz2:
+            return None
+
+        if raiz1.altura >= raiz2.altura:
+            menores, igual, maiores = self.dividir(raiz1, raiz2.chave)
+            pivo = igual
+            esquerda, direita = self.intersectar(menores, raiz2.esquerda), self.intersectar(maiores, raiz2.direita)
+        else:
+            menores, igual, maiores = self.dividir(raiz2, raiz1.chave)
+            pivo = raiz1 if igual else None
+            esquerda, direita = self.intersectar(raiz1.esquerda, menores), self.intersectar(raiz1.direita, maiores)
+        return self.juntar(esquerda, pivo, direita) if pivo else self.juntar_sem_no(esquerda, direita)
+
+    def subtrair(self, raiz1, raiz2):
+        if not raiz1 or not raiz2:
+            return raiz1
+
+        if raiz1.altura >= raiz2.altura:
+            menores, igual, maiores = self.dividir(raiz1, raiz2.chave)
+            pivo = None
+            esquerda, direita = self.subtrair(menores, raiz2.esquerda), self.subtrair(maiores, raiz2.direita)
+        else:
+            menores, igual, maiores = self.dividir(raiz2, raiz1.chave)
+            pivo = None if igual else raiz1
+            esquerda, direita = self.subtrair(raiz1.esquerda, menores), self.subtrair(raiz1.direita, maiores)
+        return self.juntar(esquerda, pivo, direita) if pivo else self.juntar_sem_no(esquerda, direita)
+
+    # Função auxiliar que retorna o nó que será religado na junção e na divisão: o próprio nó
+    # (a árvore persistente retorna uma cópia, para não alterar as versões anteriores)
+    def reutilizar_no(self, no):
+        return no
+
+    # Função auxiliar que retorna os nós de uma árvore já existente que serão religados por reconstruir(): os próprios
+    # (a árvore persistente retorna cópias; os nós recém-criados são passados a reconstruir() sem passar por aqui)
+    def reutilizar_nos(self, nos):
+        return nos
+
+    # Função auxiliar que recalcula a altura (e o tamanho e o agregado) de um nó a partir dos filhos
+    def atualizar_no(self, no):
+        altura_esquerda, altura_direita = self.obter_altura(no.esquerda), self.obter_altura(no.direita)
+        no.altura = 1 + (altura_esquerda if altura_esquerda > altura_direita else altura_direita)
+        if self.estatisticas_de_ordem:
+            no.tamanho = 1 + self.obter_tamanho(no.esquerda) + self.obter_tamanho(no.direita)
+        if self.monoide is not None:
+            self.agregar_no(no)
+
+    # Funções de Percurso (geradores sobre self.raiz, guiados por uma pilha, sem recursão e sem montar listas)
+    # A árvore não deve ser modificada enquanto um percurso estiver em andamento
+
+    # Percorre os valores em ordem crescente
+    def __iter__(self):
+        return self.em_ordem()
+
+    # Percorre os valores em ordem decrescente
+    def __reversed__(self):
+        return self.reverso()
+
+    # Gerador do percurso em ordem crescente
+    def em_ordem(self):
+        return self.range(None, None)
+
+    # Gerador do percurso em ordem decrescente
+    def reverso(self):
+        pilha = []
+        atual = self.raiz
+        while pilha or atual:
+            while atual:
+                pilha.append(atual)
+                atual = atual.direita
+            atual = pilha.pop()
+            yield atual.valor
+            atual = atual.esquerda
+
+    # Gerador dos valores no intervalo fechado [inicio, fim], em ordem crescente (None = sem limite)
+    def range(self, inicio=None, fim=None):
+        return map(attrgetter('valor'), self.nos_do_intervalo(inicio, fim))
+
+    # Gerador dos pares (valor, dado) no intervalo fechado [inicio, fim], em ordem crescente (modo mapa)
+    def items(self, inicio=None, fim=None):
+        return map(attrgetter('valor', 'dado'), self.nos_do_intervalo(inicio, fim))
+
+    # Gerador dos nós no intervalo fechado [inicio, fim], em ordem crescente (None = sem limite)
+    # A pilha inicial é montada em uma única descida até "inicio", e os nós são produzidos sob demanda
+    def nos_do_intervalo(self, inicio=None, fim=None):
+        if self.key:
+            inicio = None if inicio is None else self.key(inicio)
+            fim = None if fim is None else self.key(fim)
+
+        pilha = []
+        atual = self.raiz
+        while atual:
+            if inicio is None or not atual.chave < inicio:
+                pilha.append(atual)
+                atual = atual.esquerda
+            else:
+                # O nó e sua subárvore esquerda ficam antes do início
+                atual = atual.direita
+
+        while pilha:
+            atual = pilha.pop()
+            if fim is not None and fim < atual.chave:
+                return
+            yield atual
+
+            # Empilha o caminho até o menor valor da subárvore direita (o próximo em ordem)
+            atual = atual.direita
+            while atual:
+                pilha.append(atual)
+                atual = atual.esquerda
+
+    # Maior valor menor ou igual a "valor" (None se não existir)
+    def floor(self, valor):
+        return self.vizinho(valor, abaixo=True, inclusive=True)
+
+    # Menor valor maior ou igual a "valor" (None se não existir)
+    def ceiling(self, valor):
+        return self.vizinho(valor, abaixo=False, inclusive=True)
+
+    # Maior valor estritamente menor que "valor" (None se não existir)
+    def predecessor(self, valor):
+        return self.vizinho(valor, abaixo=True, inclusive=False)
+
+    # Menor valor estritamente maior que "valor" (None se não existir)
+    def successor(self, valor):
+        return self.vizinho(valor, abaixo=False, inclusive=False)
+
+    # Função auxiliar que, em uma única descida, encontra o vizinho mais próximo de "valor" abaixo ou acima dele
+    def vizinho(self, valor, abaixo, inclusive):
+        chave = self.key(valor) if self.key else valor
+        melhor = None
+        atual = self.raiz
+        while atual:
+            if inclusive and atual.chave == chave:
+                return atual.valor
+            if abaixo:
+                # Candidato quando está abaixo de "valor"; então procura um maior, à direita
+                if atual.chave < chave:
+                    melhor = atual
+                    atual = atual.direita
+                else:
+                    atual = atual.esquerda
+            else:
+                if chave < atual.chave:
+                    melhor = atual
+                    atual = atual.esquerda
+                else:
+                    atual = atual.direita
+        return melhor.valor if melhor else None
+
+    # Funções de Estatísticas de Ordem (sobre self.raiz, exigem estatisticas_de_ordem=True)
+    # Cada consulta lê self.raiz uma única vez e desce apenas a partir dessa raiz, então enxerga uma única versão
+    # mesmo com um escritor publicando raízes novas ao mesmo tempo (ARVORE_AVL_CONCORRENTE)
+
+    # Quantidade de valores na árvore: O(1) com estatísticas de ordem, senão um percurso completo
+    def __len__(self):
+        raiz = self.raiz
+        if self.estatisticas_de_ordem:
+            return self.obter_tamanho(raiz)
+        return len(self.listar_nos(raiz))
+
+    # Função que retorna quantos valores da árvore são menores que "valor"
+    def rank(self, valor):
+        return self.contar_menores(self.raiz, valor, inclusive=False)
+
+    # Função que retorna o k-ésimo menor valor da árvore (k começando em 0), como em uma lista ordenada
+    def select(self, k):
+        self.exigir_estatisticas_de_ordem()
+        atual = self.raiz
+        tamanho = self.obter_tamanho(atual)
+        if k < 0:
+            k += tamanho
+        if not 0 <= k < tamanho:
+            raise IndexError("Posição fora da árvore")
+
+        while True:
+            tamanho_esquerda = self.obter_tamanho(atual.esquerda)
+            if k < tamanho_esquerda:
+                atual = atual.esquerda
+            elif k == tamanho_esquerda:
+                return atual.valor
+            else:
+                # Descarta a subárvore esquerda e o próprio nó
+                k -= tamanho_esquerda + 1
+                atual = atual.direita
+
+    # Função que retorna quantos valores estão no intervalo fechado [inicio, fim]
+    # Os limites são comparados pelas chaves, nas descidas; com o intervalo invertido a diferença não é positiva
+    def count_range(self, inicio, fim):
+        raiz = self.raiz # As duas descidas partem da mesma versão
+        return max(0, self.contar_menores(raiz, fim, inclusive=True) - self.contar_menores(raiz, inicio, inclusive=False))
+
+    # Função auxiliar que conta, em uma única descida a partir de "raiz", os valores menores (ou menores ou iguais) a "valor"
+    def contar_menores(self, raiz, valor, inclusive):
+        self.exigir_estatisticas_de_ordem()
+        chave = self.key(valor) if self.key else valor
+        contagem = 0
+        atual = raiz
+        while atual:
+            if atual.chave < chave or (inclusive and atual.chave == chave):
+                # O nó e toda a sua subárvore esquerda são contados
+                contagem += self.obter_tamanho(atual.esquerda) + 1
+                atual = atual.direita
+            else:
+                atual = atual.esquerda
+        return contagem
+
+    # Funções de Métricas (opcionais: desativadas, custam uma verificação por operação)
+
+    # Função que liga os contadores de desempenho (METRICAS_AVL) e os retorna
+    def ativar_metricas(self, gancho=None):
+        self.metricas = METRICAS_AVL(gancho)
+        return self.metricas
+
+    # Função que desliga os contadores, retornando os últimos valores (ou None, se não estavam ligados)
+    def desativar_metricas(self):
+        metricas, self.metricas = self.metricas, None
+        return metricas
+
+    # Função que retorna um retrato das métricas: os contadores e o cache (None se desligados) e a forma atual da árvore
+    def stats(self):
+        return {
+            'contadores': self.metricas.instantaneo() if self.metricas is not None else None,
+            'cache': self.cache.instantaneo() if self.cache is not None else None,
+            'estrutura': self.metricas_estruturais(),
+        }
+
+    # Função que mede a forma da árvore em um percurso: quantidade de nós, altura, profundidade média,
+    # distribuição dos nós por profundidade e por altura, e memória aproximada de cada nó
+    def metricas_estruturais(self):
+        raiz = self.raiz
+        profundidades, alturas = {}, {}
+        for profundidade, altura in self.percorrer_formas(raiz):
+            profundidades[profundidade] = profundidades.get(profundidade, 0) + 1
+            alturas[altura] = alturas.get(altura, 0) + 1
+
+        quantidade = sum(profundidades.values())
+        return {
+            'nos': quantidade,
+            'altura': self.obter_altura(raiz),
+            'profundidade_media': sum(p * c for p, c in profundidades.items()) / quantidade if quantidade else 0.0,
+            'profundidades': dict(sorted(profundidades.items())),
+            'alturas': dict(sorted(alturas.items())),
+            'bytes_por_no': self.bytes_por_no(),
+        }
+
+    # Gerador de (profundidade, altura) de cada nó da subárvore (a raiz tem profundidade 0)
+    def percorrer_formas(self, raiz):
+        pilha = [(raiz, 0)] if raiz else []
+        while pilha:
+            no, profundidade = pilha.pop()
+            yield profundidade, no.altura
+            if no.esquerda:
+                pilha.append((no.esquerda, profundidade + 1))
+            if no.direita:
+                pilha.append((no.direita, profundidade + 1))
+
+    # Memória de um nó (o objeto em si, sem o valor e a carga, que são compartilhados com quem os criou)
+    def bytes_por_no(self):
+        raiz = self.raiz
+        return sys.getsizeof(raiz) if raiz else sys.getsizeof(self.tipo_no(0))
+
+    # Gerenciador de contexto que perfila um trecho de código que usa a árvore
+    # Liga contadores novos e, se pedido, o cProfile e o tracemalloc; ao final, preenche o dicionário retornado com
+    # 'metricas' (contadores do trecho), 'perfil' (pstats.Stats), 'memoria' (snapshot do tracemalloc) e 'memoria_pico_bytes'
+    # Os contadores anteriores da árvore (se houver) são restaurados ao final
+    @contextmanager
+    def perfilar(self, cprofile=True, memoria=True, gancho=None):
+        resultado = {}
+        anteriores = self.metricas
+        metricas = self.ativar_metricas(gancho)
+
+        rastreando = tracemalloc.is_tracing()
+        if memoria:
+            if not rastreando:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        perfil = cProfile.Profile() if cprofile else None
+        if perfil:
+            perfil.enable()
+        try:
+            yield resultado
+        finally:
+            if perfil:
+                perfil.disable()
+                resultado['perfil'] = pstats.Stats(perfil)
+            if memoria:
+                resultado['memoria'] = tracemalloc.take_snapshot()
+                resultado['memoria_pico_bytes'] = tracemalloc.get_traced_memory()[1]
+                if not rastreando:
+                    tracemalloc.stop()
+            resultado['metricas'] = metricas.instantaneo()
+            self.metricas = anteriores
+
+    # Funções do Cache de Busca (opcional: desativado, custa uma verificação por busca)
+    # As funções da árvore mantêm o cache correto; quem atribuir self.raiz por fora delas deve chamar limpar_cache()
+
+    # Função que liga o cache das "capacidade" chaves mais recentes (0 = sem entradas) e, se "dedo", a retomada da última descida
+    # As entradas compensam em cargas concentradas em poucas chaves (em buscas aleatórias, custam mais do que economizam)
+    # O dedo vem desligado: ele não garante O(log d) para chaves a uma distância d (veja descer_pelo_dedo) e manter o
+    # caminho custa mais do que os níveis economizados quando comparar chaves é barato (inteiros, por exemplo), mesmo
+    # em acessos próximos; só compensa com comparações caras (chaves longas, tuplas, objetos com __lt__ próprio)
+    def ativar_cache(self, capacidade=1024, dedo=False):
+        self.cache = CACHE_BUSCA_AVL(capacidade, dedo)
+        return self.cache
+
+    # Função que desliga o cache, retornando-o (ou None, se não estava ligado)
+    def desativar_cache(self):
+        cache, self.cache = self.cache, None
+        return cache
+
+    # Função que descarta as entradas e o dedo do cache, mantendo os contadores
+    def limpar_cache(self):
+        if self.cache is not None:
+            self.cache.limpar()
+
+    # Funções de Agregação (exigem um monoide)
+
+    # Função que resume, segundo o monoide, os valores com chave em [inicio, fim] (None = sem limite), em O(log n)
+    # Desce até o primeiro nó dentro do intervalo (onde os caminhos até os dois limites se separam) e, a partir dele,
+    # segue cada limite combinando apenas os agregados prontos das subárvores inteiramente dentro do intervalo
+    def aggregate(self, inicio=None, fim=None):
+        monoide = self.exigir_monoide()
+        combinar, medir = monoide.combinar, monoide.medir
+        if self.key:
+            inicio = None if inicio is None else self.key(inicio)
+            fim = None if fim is None else self.key(fim)
+
+        # Nó de separação: o primeiro com inicio <= chave <= fim
+        atual = self.raiz
+        while atual:
+            if inicio is not None and atual.chave < inicio:
+                atual = atual.direita
+            elif fim is not None and fim < atual.chave:
+                atual = atual.esquerda
+            else:
+                break
+        if not atual:
+            return monoide.identidade
+
+        # Limite inferior, na subárvore esquerda: cada nó dentro do intervalo contribui com ele mesmo e a sua direita,
+        # que vêm depois do que for encontrado mais abaixo
+        esquerda = monoide.identidade
+        no = atual.esquerda
+        while no:
+            if inicio is None or not no.chave < inicio:
+                parte = medir(no.valor, no.dado)
+                if no.direita:
+                    parte = combinar(parte, no.direita.agregado)
+                esquerda = combinar(parte, esquerda)
+                no = no.esquerda
+            else:
+                no = no.direita
+
+        # Limite superior, na subárvore direita (simétrico)
+        direita = monoide.identidade
+        no = atual.direita
+        while no:
+            if fim is None or not fim < no.chave:
+                parte = medir(no.valor, no.dado)
+                if no.esquerda:
+                    parte = combinar(no.esquerda.agregado, parte)
+                direita = combinar(direita, parte)
+                no = no.direita
+            else:
+                no = no.esquerda
+
+        return combinar(combinar(esquerda, medir(atual.valor, atual.dado)), direita)
+
+    # Função auxiliar que recalcula o agregado de um nó a partir dos filhos (já atualizados)
+    def agregar_no(self, no):
+        monoide = self.monoide
+        agregado = monoide.medir(no.valor, no.dado)
+        if no.esquerda:
+            agregado = monoide.combinar(no.esquerda.agregado, agregado)
+        if no.direita:
+            agregado = monoide.combinar(agregado, no.direita.agregado)
+        no.agregado = agregado
+
+    # Função auxiliar que impede agregações em árvores sem monoide, retornando o monoide
+    def exigir_monoide(self):
+        if self.monoide is None:
+            raise ValueError("Árvore criada sem monoide")
+        return self.monoide
+
+    # Função auxiliar que impede consultas de ordem em árvores sem o tamanho nos nós
+    def exigir_estatisticas_de_ordem(self):
+        if not self.estatisticas_de_ordem:
+            raise ValueError("Árvore criada sem estatisticas_de_ordem=True")
+
+    # Funções de Persistência (formato descrito junto a ler_snapshot)
+
+    # Função que grava a árvore (self.raiz) em um arquivo binário compacto, no mesmo leiaute de vetores da ARVORE_AVL_COMPACTA
+    # "tipo_valor" é o código de array dos valores ('q' = inteiros de 64 bits, 'd' = reais); só valores numéricos,
+    # sem cargas do modo mapa e sem função "key", podem ser gravados
+    def save(self, caminho, tipo_valor='q'):
+        if tipo_valor not in TIPOS_SNAPSHOT:
+            raise ValueError(f"Tipo de valor inválido para o snapshot: {tipo_valor}")
+        valores, esquerda, direita, altura, raiz = self.exportar_vetores()
+        vetores = (array(tipo_valor, valores), esquerda, direita, altura)
+
+        # O arquivo é sempre little-endian, para poder ser mapeado diretamente nas máquinas mais comuns
+        if sys.byteorder != 'little':
+            for vetor in vetores:
+                vetor.byteswap()
+
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(CABECALHO_SNAPSHOT.pack(MAGICO_SNAPSHOT, VERSAO_SNAPSHOT, tipo_valor.encode(), len(altura) - 1, raiz))
+            for vetor in vetores:
+                vetor.tofile(arquivo)
+
+    # Função que abre um arquivo gravado com save()
+    # Com "mmap", retorna uma ARVORE_AVL_MAPEADA (somente leitura, sem desserializar nada: abrir custa O(1));
+    # sem "mmap", os vetores são lidos de uma só vez para uma ARVORE_AVL_COMPACTA, que pode ser modificada
+    @staticmethod
+    def load(caminho, mmap=True):
+        if mmap:
+            return ARVORE_AVL_MAPEADA(caminho)
+
+        with open(caminho, 'rb') as arquivo:
+            conteudo = memoryview(arquivo.read())
+        tipo_valor, raiz, vetores = ler_snapshot(conteudo)
+
+        arvore = ARVORE_AVL_COMPACTA(tipo_valor=tipo_valor)
+        pool = arvore.nos
+        for vetor, (_, inicio, fim) in zip((pool.valores, pool.esquerda, pool.direita, pool.altura), vetores):
+            del vetor[:]
+            vetor.frombytes(conteudo[inicio:fim])
+            if sys.byteorder != 'little':
+                vetor.byteswap()
+        arvore.raiz = raiz
+        return arvore
+
+    # Função auxiliar que numera os nós em ordem (1 a n, 0 = nó nulo) e retorna os vetores do snapshot:
+    # (valores, esquerda, direita, altura, raiz), todos com a posição 0 ocupada pelo nó nulo
+    def exportar_vetores(self):
+        if self.key is not None:
+            raise ValueError("Árvores com função key não podem ser gravadas")
+        nos = self.listar_nos(self.raiz)
+        if any(no.dado is not None for no in nos):
+            raise ValueError("Árvores no modo mapa (com cargas) não podem ser gravadas")
+
+        numero = {id(no): i for i, no in enumerate(nos, 1)}
+        numero[id(None)] = 0
+        valores = [0]
+        valores.extend(no.valor for no in nos)
+        esquerda, direita, altura = array('i', [0]), array('i', [0]), array('b', [0])
+        esquerda.extend(numero[id(no.esquerda)] for no in nos)
+        direita.extend(numero[id(no.direita)] for no in nos)
+        altura.extend(no.altura for no in nos)
+        return valores, esquerda, direita, altura, numero[id(self.raiz)]
+
     # Função auxiliar para encontrar o menor valor na subárvore
     def obter_minimo(self, raiz):
         # Começa pelo nó recebido (raiz da subárvore)
@@ -306,6 +1767,10 @@ class ARVORE_AVL:
         # Retorna o nó com o menor valor encontrado
         return atual
     
+    # Função auxiliar para obter o tamanho da subárvore de um nó, ou (0) se o nó for None
+    def obter_tamanho(self, raiz):
+        return raiz.tamanho if raiz else 0
+
     # Função auxiliar para obter a altura de um nó
     def obter_altura(self, raiz):
         # Retorna a altura do nó (1), ou (0) se o nó for None (vazio)
@@ -319,6 +1784,986 @@ class ARVORE_AVL:
 
 # Fim classe AVL    
 
+# Início Classe da Árvore de Intervalos: uma ARVORE_AVL cujos valores são intervalos fechados (inicio, fim),
+# ordenados pelo início, em que cada nó guarda o maior fim da sua subárvore (monoide MONOIDE_FIM_MAXIMO)
+# Com esse agregado, as subárvores que terminam antes do intervalo consultado são descartadas de uma vez
+class ARVORE_AVL_INTERVALOS(ARVORE_AVL):
+
+    def __init__(self, update_arvore=None, update_historico=None, estatisticas_de_ordem=False):
+        super().__init__(update_arvore, update_historico, estatisticas_de_ordem, monoide=MONOIDE_FIM_MAXIMO)
+
+    # Gerador, em ordem de início, dos intervalos que se sobrepõem a [inicio, fim] (um ponto: sobrepostos(p, p))
+    # Percurso em ordem que pula as subárvores cujo maior fim fica antes de "inicio" e para no primeiro
+    # início depois de "fim"; custa O((k + 1) log n), sendo k a quantidade de intervalos retornados
+    def sobrepostos(self, inicio, fim):
+        pilha = []
+        atual = self.raiz
+        while pilha or atual:
+            while atual and not atual.agregado < inicio:
+                pilha.append(atual)
+                atual = atual.esquerda
+            if not pilha:
+                return
+
+            no = pilha.pop()
+            # Os inícios são crescentes: nenhum intervalo daqui em diante começa antes do fim da consulta
+            if fim < no.valor[0]:
+                return
+            if not no.valor[1] < inicio:
+                yield no.valor
+            atual = no.direita
+# Fim classe AVL de intervalos
+
+# Início Classe que armazena os nós de forma compacta (estrutura de vetores)
+# Cada nó é apenas um índice: os filhos ficam em "array('i')" e as alturas em "array('b')"
+# O índice 0 é reservado como "nó nulo" (equivalente ao None), com altura 0
+class POOL_NOS_AVL:
+    def __init__(self, tipo_valor=None):
+        # Os valores ficam em uma lista comum ou, se "tipo_valor" for informado (ex.: 'q' para inteiros), em um array
+        self.valores = array(tipo_valor, [0]) if tipo_valor else [None]
+        self.esquerda = array('i', [0])
+        self.direita = array('i', [0])
+        self.altura = array('b', [0])
+        self.livres = array('i') # Lista de índices liberados pela remoção, reaproveitados nas próximas inserções
+
+    # Função que aloca um novo nó (folha) e retorna o seu índice
+    def alocar(self, valor):
+        if self.livres:
+            indice = self.livres.pop()
+            self.valores[indice] = valor
+            self.esquerda[indice] = 0
+            self.direita[indice] = 0
+            self.altura[indice] = 1
+            return indice
+
+        self.valores.append(valor)
+        self.esquerda.append(0)
+        self.direita.append(0)
+        self.altura.append(1)
+        return len(self.altura) - 1
+
+    # Função que aloca um nó (folha) para cada valor, de uma só vez, e retorna a lista de índices
+    def alocar_varios(self, valores):
+        # Havendo índices livres, eles são reaproveitados primeiro
+        if self.livres:
+            return [self.alocar(valor) for valor in valores]
+
+        inicio = len(self.altura)
+        self.valores.extend(valores)
+        quantidade = len(self.valores) - inicio
+        self.esquerda.extend(array('i', bytes(4 * quantidade)))
+        self.direita.extend(array('i', bytes(4 * quantidade)))
+        self.altura.extend(array('b', b'\x01' * quantidade))
+        return list(range(inicio, inicio + quantidade))
+
+    # Função que devolve um nó à lista de livres
+    def liberar(self, indice):
+        # Solta a referência ao valor (no caso da lista comum) para que ele possa ser coletado
+        if isinstance(self.valores, list):
+            self.valores[indice] = None
+        self.livres.append(indice)
+
+    # Esvazia o pool mantendo os mesmos objetos de vetor (e apenas o nó nulo)
+    def limpar(self):
+        del self.valores[1:]
+        del self.esquerda[1:]
+        del self.direita[1:]
+        del self.altura[1:]
+        del self.livres[:]
+
+    # Quantidade de nós em uso
+    def __len__(self):
+        return len(self.altura) - 1 - len(self.livres)
+
+    # Memória aproximada ocupada pelos vetores (sem contar os objetos de valor guardados em lista comum)
+    def bytes_ocupados(self):
+        total = 0
+        for vetor in (self.esquerda, self.direita, self.altura, self.livres):
+            total += vetor.buffer_info()[1] * vetor.itemsize
+        if isinstance(self.valores, list):
+            total += len(self.valores) * 8 # Uma referência por posição
+        else:
+            total += self.valores.buffer_info()[1] * self.valores.itemsize
+        return total
+# Fim Classe POOL_NOS_AVL
+
+# Início Classe da Árvore-AVL que opera sobre o POOL_NOS_AVL
+# Possui a mesma interface da ARVORE_AVL, mas a "raiz" e os nós são índices inteiros (0 = árvore vazia)
+# O próprio valor é a chave de comparação: o modo mapa, a função "key", as estatísticas de ordem
+# e as funções de divisão, junção e conjunto não são suportados
+class ARVORE_AVL_COMPACTA(ARVORE_AVL):
+
+    def __init__(self, update_arvore=None, update_historico=None, tipo_valor=None):
+        super().__init__(update_arvore, update_historico)
+        self.nos = POOL_NOS_AVL(tipo_valor)
+        self.raiz = 0
+        self.chave_do_no = self.nos.valores.__getitem__ # O próprio valor é a chave de comparação
+
+    # Funções auxiliares das cargas e operações em lote (ver ARVORE_AVL.bulk_load)
+
+    # Aloca um nó solto no pool (o modo mapa não é suportado, "dado" é ignorado, e a chave é o próprio valor)
+    def novo_no(self, valor, dado=None, chave=None):
+        return self.nos.alocar(valor)
+
+    # Aloca um nó para cada valor de uma só vez, estendendo os vetores do pool
+    def novos_nos(self, valores, chaves=None):
+        nos = self.nos.alocar_varios(valores)
+        if self.metricas is not None:
+            self.metricas.alocacoes += len(nos)
+        return nos
+
+    # Os nós do pool não têm onde guardar cargas: as funções do modo mapa geram TypeError
+    def sem_mapa(self, *argumentos, **opcoes):
+        raise TypeError("ARVORE_AVL_COMPACTA não suporta o modo mapa")
+
+    ativar_mapa = __setitem__ = __getitem__ = __delitem__ = get = pop = setdefault = items = atualizar_lote = sem_mapa
+
+    # A divisão, a junção e as operações de conjunto religam nós-objeto: também geram TypeError
+    def sem_divisao(self, *argumentos, **opcoes):
+        raise TypeError("ARVORE_AVL_COMPACTA não suporta as funções de divisão, junção e conjunto")
+
+    join = split = union = intersection = difference = sem_divisao
+
+    # O pool sabe quantos nós estão em uso, então a decisão das operações em lote usa o tamanho exato
+    def estimar_tamanho(self):
+        return len(self.nos)
+
+    # Devolve ao pool um nó que saiu da árvore
+    def descartar_no(self, no):
+        self.nos.liberar(no)
+
+    # Esvazia a árvore e o pool
+    def limpar(self):
+        self.nos.limpar()
+        self.raiz = 0
+
+    # Religa os índices de nos[inicio:fim] em uma subárvore balanceada, equivalente a ARVORE_AVL.construir_balanceado
+    def construir_balanceado(self, nos, inicio, fim):
+        if inicio >= fim:
+            return 0
+
+        pool = self.nos
+        meio = (inicio + fim) // 2
+        no = nos[meio]
+        esquerda = pool.esquerda[no] = self.construir_balanceado(nos, inicio, meio)
+        direita = pool.direita[no] = self.construir_balanceado(nos, meio + 1, fim)
+        pool.altura[no] = 1 + max(pool.altura[esquerda], pool.altura[direita])
+        return no
+
+    # Rotação à esquerda sobre o índice "x", retornando o índice da nova raiz da subárvore
+    def rotacionar_esquerda(self, x):
+        esquerda, direita, altura = self.nos.esquerda, self.nos.direita, self.nos.altura
+        y = direita[x]
+        direita[x] = esquerda[y]
+        esquerda[y] = x
+        altura[x] = 1 + max(altura[esquerda[x]], altura[direita[x]])
+        altura[y] = 1 + max(altura[esquerda[y]], altura[direita[y]])
+        return y
+
+    # Rotação à direita sobre o índice "x", retornando o índice da nova raiz da subárvore
+    def rotacionar_direita(self, x):
+        esquerda, direita, altura = self.nos.esquerda, self.nos.direita, self.nos.altura
+        y = esquerda[x]
+        esquerda[x] = direita[y]
+        direita[y] = x
+        altura[x] = 1 + max(altura[esquerda[x]], altura[direita[x]])
+        altura[y] = 1 + max(altura[esquerda[y]], altura[direita[y]])
+        return y
+
+    # Inserção iterativa, equivalente a ARVORE_AVL.inserir
+    def inserir(self, raiz, valor):
+        nos = self.nos
+        if self.cache is not None:
+            self.cache.invalidar(valor)
+        if not raiz:
+            raiz = nos.alocar(valor)
+            if self.metricas is not None:
+                self.metricas.registrar('inserir', 0, 0)
+                self.metricas.alocacoes += 1
+            if self.eventos is not None:
+                self.registrar('insercao', valor)
+            return raiz
+
+        valores, esquerda, direita = nos.valores, nos.esquerda, nos.direita
+        caminho = []
+        atual = raiz
+        while atual:
+            caminho.append(atual)
+            atual = esquerda[atual] if valor < valores[atual] else direita[atual]
+
+        if self.metricas is not None:
+            self.metricas.registrar('inserir', len(caminho), len(caminho) + 1)
+            self.metricas.alocacoes += 1
+
+        pai = caminho[-1]
+        if valor < valores[pai]:
+            esquerda[pai] = nos.alocar(valor)
+        else:
+            direita[pai] = nos.alocar(valor)
+
+        raiz = self.rebalancear_caminho(raiz, caminho)
+        if self.eventos is not None:
+            self.registrar('insercao', valor)
+        return raiz
+
+    # Remoção iterativa, equivalente a ARVORE_AVL.remover (o índice removido volta para a lista de livres)
+    def remover(self, raiz, valor):
+        nos = self.nos
+        if self.cache is not None:
+            self.cache.invalidar(valor)
+        valores, esquerda, direita = nos.valores, nos.esquerda, nos.direita
+        caminho = []
+        atual = raiz
+        while atual and valor != valores[atual]:
+            caminho.append(atual)
+            atual = esquerda[atual] if valor < valores[atual] else direita[atual]
+
+        if self.metricas is not None:
+            encontrado = 1 if atual else 0
+            self.metricas.registrar('remover', len(caminho) + encontrado, 2 * len(caminho) + encontrado)
+
+        if not atual:
+            if self.eventos is not None:
+                self.registrar('nao_encontrado', valor)
+            return raiz
+
+        if esquerda[atual] and direita[atual]:
+            caminho.append(atual)
+            sucessor = direita[atual]
+            while esquerda[sucessor]:
+                caminho.append(sucessor)
+                sucessor = esquerda[sucessor]
+
+            if self.cache is not None:
+                self.cache.invalidar(valores[sucessor]) # O índice do sucessor volta ao pool
+            valores[atual] = valores[sucessor]
+            removido, substituto = sucessor, direita[sucessor]
+        else:
+            removido, substituto = atual, esquerda[atual] or direita[atual]
+
+        nos.liberar(removido)
+        if not caminho:
+            if self.eventos is not None:
+                self.registrar('remocao', valor)
+            return substituto
+
+        pai = caminho[-1]
+        if esquerda[pai] == removido:
+            esquerda[pai] = substituto
+        else:
+            direita[pai] = substituto
+
+        raiz = self.rebalancear_caminho(raiz, caminho)
+        if self.eventos is not None:
+            self.registrar('remocao', valor)
+        return raiz
+
+    # Subida pelo caminho com parada antecipada, equivalente a ARVORE_AVL.rebalancear_caminho
+    def rebalancear_caminho(self, raiz, caminho):
+        esquerda, direita, altura = self.nos.esquerda, self.nos.direita, self.nos.altura
+        for i in range(len(caminho) - 1, -1, -1):
+            no = caminho[i]
+            altura_anterior = altura[no]
+            altura_esquerda = altura[esquerda[no]]
+            altura_direita = altura[direita[no]]
+            altura[no] = 1 + (altura_esquerda if altura_esquerda > altura_direita else altura_direita)
+
+            balanceamento = altura_esquerda - altura_direita
+            if balanceamento > 1 or balanceamento < -1:
+                nova = self.balancear(no, balanceamento)
+                if i == 0:
+                    raiz = nova
+                elif esquerda[caminho[i - 1]] == no:
+                    esquerda[caminho[i - 1]] = nova
+                else:
+                    direita[caminho[i - 1]] = nova
+                no = nova
+
+            if altura[no] == altura_anterior:
+                break
+
+        return raiz
+
+    # Escolha da rotação, equivalente a ARVORE_AVL.balancear
+    def balancear(self, raiz, balanceamento):
+        nos = self.nos
+        pivo = nos.valores[raiz]
+        if balanceamento > 1:
+            if self.obter_balanceamento(nos.esquerda[raiz]) >= 0:
+                rotacao = 'direita'
+                raiz = self.rotacionar_direita(raiz)
+            else:
+                rotacao = 'esquerda_direita'
+                nos.esquerda[raiz] = self.rotacionar_esquerda(nos.esquerda[raiz])
+                raiz = self.rotacionar_direita(raiz)
+        else:
+            if self.obter_balanceamento(nos.direita[raiz]) <= 0:
+                rotacao = 'esquerda'
+                raiz = self.rotacionar_esquerda(raiz)
+            else:
+                rotacao = 'direita_esquerda'
+                nos.direita[raiz] = self.rotacionar_direita(nos.direita[raiz])
+                raiz = self.rotacionar_esquerda(raiz)
+
+        if self.eventos is not None:
+            self.eventos.append(EVENTO_AVL('rotacao', rotacao=rotacao, pivo=pivo))
+        if self.metricas is not None:
+            self.metricas.rotacoes[rotacao] += 1
+        return raiz
+
+    # Busca iterativa, equivalente a ARVORE_AVL.buscar
+    def buscar(self, raiz, valor):
+        if self.cache is not None:
+            return self.buscar_em_cache(raiz, valor) != 0
+        if self.metricas is not None:
+            return self.buscar_medido(raiz, valor) != 0
+
+        valores, esquerda, direita = self.nos.valores, self.nos.esquerda, self.nos.direita
+        atual = raiz
+        while atual:
+            if valor == valores[atual]:
+                return True
+            atual = esquerda[atual] if valor < valores[atual] else direita[atual]
+        return False
+
+    # Busca equivalente a ARVORE_AVL.buscar_no, retornando o índice do nó encontrado (ou None)
+    def buscar_no(self, raiz, valor):
+        if self.cache is not None:
+            return self.buscar_em_cache(raiz, valor) or None
+        if self.metricas is not None:
+            return self.buscar_medido(raiz, valor) or None
+
+        valores, esquerda, direita = self.nos.valores, self.nos.esquerda, self.nos.direita
+        atual = raiz
+        while atual:
+            if valor == valores[atual]:
+                return atual
+            atual = esquerda[atual] if valor < valores[atual] else direita[atual]
+        return None
+
+    # Busca medida equivalente a ARVORE_AVL.buscar_medido, retornando o índice encontrado (ou 0)
+    def buscar_medido(self, raiz, valor):
+        valores, esquerda, direita = self.nos.valores, self.nos.esquerda, self.nos.direita
+        visitados = comparacoes = 0
+        atual = raiz
+        while atual:
+            visitados += 1
+            comparacoes += 1
+            if valor == valores[atual]:
+                break
+            comparacoes += 1
+            atual = esquerda[atual] if valor < valores[atual] else direita[atual]
+        self.metricas.registrar('buscar', visitados, comparacoes)
+        return atual
+
+    # Os nós são índices: os filhos e a chave (o próprio valor) são lidos dos vetores do pool
+    # (com eles, ARVORE_AVL.descer_pelo_dedo retorna o índice encontrado, ou 0)
+    def acessores_no(self):
+        return self.nos.esquerda.__getitem__, self.nos.direita.__getitem__, self.nos.valores.__getitem__
+
+    # Percurso decrescente equivalente a ARVORE_AVL.reverso
+    def reverso(self):
+        valores, esquerda, direita = self.nos.valores, self.nos.esquerda, self.nos.direita
+        pilha = []
+        atual = self.raiz
+        while pilha or atual:
+            while atual:
+                pilha.append(atual)
+                atual = direita[atual]
+            atual = pilha.pop()
+            yield valores[atual]
+            atual = esquerda[atual]
+
+    # Percurso do intervalo [inicio, fim] equivalente a ARVORE_AVL.range
+    def range(self, inicio=None, fim=None):
+        valores, esquerda, direita = self.nos.valores, self.nos.esquerda, self.nos.direita
+        pilha = []
+        atual = self.raiz
+        while atual:
+            if inicio is None or not valores[atual] < inicio:
+                pilha.append(atual)
+                atual = esquerda[atual]
+            else:
+                atual = direita[atual]
+
+        while pilha:
+            atual = pilha.pop()
+            if fim is not None and fim < valores[atual]:
+                return
+            yield valores[atual]
+            atual = direita[atual]
+            while atual:
+                pilha.append(atual)
+                atual = esquerda[atual]
+
+    # Busca do vizinho equivalente a ARVORE_AVL.vizinho
+    def vizinho(self, valor, abaixo, inclusive):
+        valores, esquerda, direita = self.nos.valores, self.nos.esquerda, self.nos.direita
+        melhor = 0
+        atual = self.raiz
+        while atual:
+            if inclusive and valores[atual] == valor:
+                return valores[atual]
+            if abaixo:
+                if valores[atual] < valor:
+                    melhor = atual
+                    atual = direita[atual]
+                else:
+                    atual = esquerda[atual]
+            else:
+                if valor < valores[atual]:
+                    melhor = atual
+                    atual = esquerda[atual]
+                else:
+                    atual = direita[atual]
+        return valores[melhor] if melhor else None
+
+    # Quantidade de nós em uso no pool (O(1))
+    def __len__(self):
+        return len(self.nos)
+
+    # Percurso em ordem equivalente a ARVORE_AVL.listar_em_ordem
+    def listar_em_ordem(self, raiz):
+        valores = self.nos.valores
+        return [valores[no] for no in self.listar_nos(raiz)]
+
+    # Percurso em ordem equivalente a ARVORE_AVL.listar_nos, retornando os índices
+    def listar_nos(self, raiz):
+        esquerda, direita = self.nos.esquerda, self.nos.direita
+        resultado = []
+        pilha = []
+        atual = raiz
+        while pilha or atual:
+            while atual:
+                pilha.append(atual)
+                atual = esquerda[atual]
+            atual = pilha.pop()
+            resultado.append(atual)
+            atual = direita[atual]
+        return resultado
+
+    # Retorna o índice do menor valor da subárvore
+    def obter_minimo(self, raiz):
+        esquerda = self.nos.esquerda
+        while esquerda[raiz]:
+            raiz = esquerda[raiz]
+        return raiz
+
+    def obter_altura(self, raiz):
+        return self.nos.altura[raiz] if raiz else 0
+
+    def obter_balanceamento(self, raiz):
+        nos = self.nos
+        return nos.altura[nos.esquerda[raiz]] - nos.altura[nos.direita[raiz]] if raiz else 0
+
+    # Percurso de formas equivalente a ARVORE_AVL.percorrer_formas, sobre os índices
+    def percorrer_formas(self, raiz):
+        esquerda, direita, altura = self.nos.esquerda, self.nos.direita, self.nos.altura
+        pilha = [(raiz, 0)] if raiz else []
+        while pilha:
+            no, profundidade = pilha.pop()
+            yield profundidade, altura[no]
+            if esquerda[no]:
+                pilha.append((esquerda[no], profundidade + 1))
+            if direita[no]:
+                pilha.append((direita[no], profundidade + 1))
+
+    # Memória média de um nó: a ocupação dos vetores do pool dividida pela quantidade de nós
+    def bytes_por_no(self):
+        return self.nos.bytes_ocupados() / max(1, len(self.nos))
+
+    # Numeração em ordem equivalente a ARVORE_AVL.exportar_vetores, traduzindo os índices do pool
+    def exportar_vetores(self):
+        pool = self.nos
+        nos = self.listar_nos(self.raiz)
+        numero = array('i', bytes(4 * len(pool.altura))) # Índice do pool -> número em ordem (o nó nulo continua 0)
+        for i, no in enumerate(nos, 1):
+            numero[no] = i
+
+        valores = [0]
+        valores.extend(pool.valores[no] for no in nos)
+        esquerda, direita, altura = array('i', [0]), array('i', [0]), array('b', [0])
+        esquerda.extend(numero[pool.esquerda[no]] for no in nos)
+        direita.extend(numero[pool.direita[no]] for no in nos)
+        altura.extend(pool.altura[no] for no in nos)
+        return valores, esquerda, direita, altura, numero[self.raiz]
+
+# Fim classe AVL compacta
+
+# Formato do snapshot gravado por ARVORE_AVL.save (little-endian):
+# cabeçalho de 32 bytes (mágico "AVL1", versão, código do tipo dos valores, quantidade n de nós, índice da raiz)
+# seguido de quatro vetores com n + 1 posições: valores, filhos esquerdos ('i'), filhos direitos ('i') e alturas ('b')
+# A posição 0 é o nó nulo e os nós são numerados em ordem crescente, então o vetor de valores fica ordenado
+MAGICO_SNAPSHOT = b'AVL1'
+VERSAO_SNAPSHOT = 1
+CABECALHO_SNAPSHOT = struct.Struct('<4sBc2xqq8x')
+TIPOS_SNAPSHOT = 'bBhHiIlLqQfd' # Códigos de array numéricos aceitos para os valores
+
+# Função que valida o cabeçalho de um snapshot e retorna (tipo_valor, raiz, [(código, início, fim) de cada vetor])
+def ler_snapshot(buffer):
+    if len(buffer) < CABECALHO_SNAPSHOT.size:
+        raise ValueError("Arquivo pequeno demais para ser um snapshot de árvore AVL")
+    magico, versao, tipo_valor, quantidade, raiz = CABECALHO_SNAPSHOT.unpack_from(buffer)
+    tipo_valor = tipo_valor.decode('ascii', 'replace')
+    if magico != MAGICO_SNAPSHOT or versao != VERSAO_SNAPSHOT or tipo_valor not in TIPOS_SNAPSHOT:
+        raise ValueError("Arquivo não é um snapshot de árvore AVL (ou é de outra versão)")
+
+    vetores = []
+    inicio = CABECALHO_SNAPSHOT.size
+    for codigo in (tipo_valor, 'i', 'i', 'b'):
+        fim = inicio + (quantidade + 1) * array(codigo).itemsize
+        vetores.append((codigo, inicio, fim))
+        inicio = fim
+    if len(buffer) < inicio:
+        raise ValueError("Snapshot de árvore AVL truncado")
+    return tipo_valor, raiz, vetores
+
+# Início Classe da Árvore-AVL somente leitura sobre um snapshot mapeado em memória (mmap)
+# Os vetores do pool são visões (memoryview) diretamente sobre o arquivo: abrir não desserializa nada,
+# e cada página só é lida do disco quando uma busca ou um percurso passa por ela
+# As buscas e percursos são os da ARVORE_AVL_COMPACTA; qualquer modificação gera TypeError
+class ARVORE_AVL_MAPEADA(ARVORE_AVL_COMPACTA):
+
+    def __init__(self, caminho):
+        if sys.byteorder != 'little':
+            raise ValueError("O mapeamento direto do snapshot exige uma máquina little-endian (use mmap=False)")
+        super().__init__()
+
+        with open(caminho, 'rb') as arquivo:
+            self.arquivo_mapeado = mapear_arquivo(arquivo.fileno(), 0, access=ACCESS_READ)
+        try:
+            tipo_valor, self.raiz, vetores = ler_snapshot(self.arquivo_mapeado)
+        except ValueError:
+            self.arquivo_mapeado.close() # Arquivo inválido: o mapeamento não fica aberto
+            raise
+
+        # Uma visão de cada vetor, sem cópia; ficam guardadas para serem liberadas antes de fechar o mapa
+        visao = memoryview(self.arquivo_mapeado)
+        self.visoes = [visao[inicio:fim].cast(codigo) for codigo, inicio, fim in vetores] + [visao]
+        pool = self.nos
+        pool.valores, pool.esquerda, pool.direita, pool.altura = self.visoes[:4]
+        self.chave_do_no = pool.valores.__getitem__
+
+    # Memória média de um nó: o tamanho dos vetores mapeados dividido pela quantidade de nós
+    def bytes_por_no(self):
+        return sum(visao.nbytes for visao in self.visoes[:4]) / max(1, len(self.nos))
+
+    # Percurso do intervalo [inicio, fim]: como os nós estão numerados em ordem, os valores já estão ordenados no vetor
+    # Os limites são localizados por busca binária e o trecho é lido sequencialmente, sem pilha
+    def range(self, inicio=None, fim=None):
+        valores = self.nos.valores
+        primeiro = 1 if inicio is None else bisect.bisect_left(valores, inicio, 1)
+        ultimo = len(valores) if fim is None else bisect.bisect_right(valores, fim, primeiro)
+        yield from valores[primeiro:ultimo]
+
+    # Libera as visões e fecha o mapeamento (a árvore deixa de poder ser consultada)
+    def fechar(self):
+        for visao in self.visoes:
+            visao.release()
+        self.arquivo_mapeado.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    # Operações que modificariam o arquivo mapeado
+    def somente_leitura(self, *argumentos, **opcoes):
+        raise TypeError("ARVORE_AVL_MAPEADA é somente leitura (use ARVORE_AVL.load(caminho, mmap=False) para modificar)")
+
+    inserir = remover = novo_no = novos_nos = descartar_no = limpar = somente_leitura
+
+# Fim classe AVL mapeada
+
+# Início Classe da Árvore-AVL persistente (imutável e versionada)
+# Nenhum nó é alterado depois de criado: inserir() e remover() copiam apenas o caminho afetado (O(log n) nós)
+# e retornam uma nova raiz, que compartilha todas as subárvores intocadas com a raiz anterior
+# Toda raiz antiga continua sendo uma árvore válida, e versao() a embrulha em uma árvore própria para consultas
+class ARVORE_AVL_PERSISTENTE(ARVORE_AVL):
+
+    # Função que retorna uma alça para a versão atual (self.raiz), em O(1) e sem copiar nós
+    # A alça é uma árvore da mesma classe, sem assinantes, que aceita todas as consultas (buscar, range, rank...)
+    # Escritas na alça criam um ramo novo, sem afetar esta árvore, e vice-versa
+    def versao(self):
+        versao = type(self)(estatisticas_de_ordem=self.estatisticas_de_ordem, key=self.key, monoide=self.monoide,
+                            mapa=self.mapa)
+        versao.raiz = self.raiz
+        return versao
+
+    # Funções de Cópia de Caminho
+
+    # Função que cria uma cópia solta de um nó (mesmos filhos), que pode ser alterada sem afetar as versões que compartilham o original
+    def copiar_no(self, no):
+        copia = self.tipo_no.__new__(self.tipo_no) # Sem passar pelo __init__, já que todos os campos são copiados
+        copia.valor = no.valor
+        if self.key:
+            copia.chave = no.chave
+        if self.mapa:
+            copia.dado = no.dado
+        copia.esquerda = no.esquerda
+        copia.direita = no.direita
+        copia.altura = no.altura
+        if self.estatisticas_de_ordem:
+            copia.tamanho = no.tamanho
+        if self.monoide is not None:
+            copia.agregado = no.agregado
+        if self.metricas is not None:
+            self.metricas.alocacoes += 1
+        return copia
+
+    # Função que copia o caminho que inserir() ou remover() percorrerá para "chave", retornando a raiz da cópia
+    # Na remoção, o caminho até o sucessor também é copiado; se a chave não existir, retorna None (nada a alterar)
+    def copiar_caminho(self, raiz, chave, remocao=False, substituir=False):
+        if not raiz:
+            return None if remocao else raiz
+
+        copiar = self.copiar_no
+        nova = atual = copiar(raiz)
+        while True:
+            if chave == atual.chave and (remocao or substituir):
+                # Na remoção de um nó com dois filhos, o sucessor (menor valor da subárvore direita) também sai do lugar
+                if remocao and atual.esquerda and atual.direita:
+                    atual.direita = atual = copiar(atual.direita)
+                    while atual.esquerda:
+                        atual.esquerda = atual = copiar(atual.esquerda)
+                return nova
+
+            # Mesma regra de descida da inserção e da remoção (valores iguais seguem para a direita)
+            if chave < atual.chave:
+                if not atual.esquerda:
+                    break
+                atual.esquerda = atual = copiar(atual.esquerda)
+            else:
+                if not atual.direita:
+                    break
+                atual.direita = atual = copiar(atual.direita)
+
+        return None if remocao else nova
+
+    # Inserção com cópia de caminho: a inserção comum altera apenas nós do caminho, que agora são cópias
+    def inserir(self, raiz, valor, dado=None, substituir=False, chave=None):
+        if chave is None:
+            chave = self.key(valor) if self.key else valor
+        copia = self.copiar_caminho(raiz, chave, substituir=substituir)
+        self.caminho_copiado = True
+        try:
+            return super().inserir(copia, valor, dado, substituir, chave)
+        finally:
+            self.caminho_copiado = False
+
+    # Remoção com cópia de caminho (se o valor não existir, a remoção comum apenas registra o evento)
+    def remover(self, raiz, valor):
+        chave = self.key(valor) if self.key else valor
+        copia = self.copiar_caminho(raiz, chave, remocao=True)
+        return super().remover(raiz if copia is None else copia, valor)
+
+    # As rotações também alteram o filho do lado mais alto (e, na rotação dupla, o neto), que podem estar fora do caminho
+    # Na inserção eles estão sempre no caminho (o lado mais alto é o que cresceu), então já são cópias
+    caminho_copiado = False
+
+    def balancear(self, raiz, balanceamento):
+        if self.caminho_copiado:
+            return super().balancear(raiz, balanceamento)
+        if balanceamento > 1:
+            filho = raiz.esquerda = self.copiar_no(raiz.esquerda)
+            if self.obter_balanceamento(filho) < 0:
+                filho.direita = self.copiar_no(filho.direita)
+        else:
+            filho = raiz.direita = self.copiar_no(raiz.direita)
+            if self.obter_balanceamento(filho) > 0:
+                filho.esquerda = self.copiar_no(filho.esquerda)
+        return super().balancear(raiz, balanceamento)
+
+    # A reconstrução das operações em lote religa os nós, então os nós das versões existentes são copiados antes
+    def reutilizar_nos(self, nos):
+        return [self.copiar_no(no) for no in nos]
+
+    # Os nós antigos pertencem às versões anteriores, e a raiz antiga continua valendo até a nova ser atribuída
+    def limpar(self):
+        pass
+
+    # A junção e a divisão também religam apenas cópias, então as raízes recebidas nas operações de conjunto continuam valendo
+    def reutilizar_no(self, no):
+        return self.copiar_no(no)
+
+# Fim classe AVL persistente
+
+# Início Classe da Árvore-AVL concorrente: um escritor por vez e qualquer número de leitores sem trava
+# As escritas são as da árvore persistente, então nunca alteram um nó já publicado, e a nova raiz
+# é publicada com uma única atribuição a self.raiz, que é atômica
+# Um leitor lê self.raiz uma vez e, dali em diante, enxerga uma versão fixa e consistente da árvore
+# (buscar, os percursos e o modo mapa funcionam assim sem nenhuma trava, e escalam no Python sem GIL)
+# Os escritores se serializam pela trava "escrita": as funções do modo mapa e de lote já a usam, e quem chama
+# inserir() ou remover() diretamente deve fazer "with arvore.escrita: arvore.raiz = arvore.inserir(arvore.raiz, valor)"
+class ARVORE_AVL_CONCORRENTE(ARVORE_AVL_PERSISTENTE):
+
+    def __init__(self, update_arvore=None, update_historico=None, estatisticas_de_ordem=False, key=None, monoide=None,
+                 mapa=False):
+        super().__init__(update_arvore, update_historico, estatisticas_de_ordem, key, monoide, mapa)
+        self.escrita = threading.RLock()
+
+    # Funções de escrita sobre self.raiz, serializadas pela trava do escritor
+
+    def __setitem__(self, chave, dado):
+        with self.escrita:
+            super().__setitem__(chave, dado)
+
+    def pop(self, chave, *padrao):
+        with self.escrita:
+            return super().pop(chave, *padrao)
+
+    def ativar_mapa(self):
+        with self.escrita:
+            super().ativar_mapa()
+
+    def setdefault(self, chave, padrao=None):
+        with self.escrita:
+            return super().setdefault(chave, padrao)
+
+    def bulk_load(self, valores, manter_duplicados=False):
+        with self.escrita:
+            return super().bulk_load(valores, manter_duplicados)
+
+    def inserir_lote(self, valores):
+        with self.escrita:
+            return super().inserir_lote(valores)
+
+    def remover_lote(self, valores, removidos=None):
+        with self.escrita:
+            return super().remover_lote(valores, removidos)
+
+    def atualizar_lote(self, pares):
+        with self.escrita:
+            return super().atualizar_lote(pares)
+
+    # O cache de busca é alterado a cada consulta, o que exigiria uma trava também nos leitores
+    def ativar_cache(self, capacidade=1024, dedo=False):
+        raise TypeError("ARVORE_AVL_CONCORRENTE não suporta o cache de busca (os leitores não usam trava)")
+
+# Fim classe AVL concorrente
+
+# Função executada em cada processo do contêiner particionado: mantém uma ARVORE_AVL_COMPACTA com as chaves
+# da sua faixa e atende aos pedidos recebidos pela conexão, respondendo (sucesso, resultado)
+def servir_particao(conexao, tipo_valor):
+    arvore = ARVORE_AVL_COMPACTA(tipo_valor=tipo_valor)
+    while True:
+        pedido, *argumentos = conexao.recv()
+        if pedido == 'fechar':
+            conexao.close()
+            return
+        try:
+            if pedido == 'inserir':
+                arvore.raiz = arvore.inserir(arvore.raiz, argumentos[0])
+                resultado = None
+            elif pedido == 'remover':
+                arvore.raiz = arvore.remover(arvore.raiz, argumentos[0])
+                resultado = None
+            elif pedido == 'buscar':
+                resultado = arvore.buscar(arvore.raiz, argumentos[0])
+            elif pedido == 'inserir_lote':
+                arvore.inserir_lote(argumentos[0])
+                resultado = None
+            elif pedido == 'range':
+                resultado = list(arvore.range(*argumentos))
+            elif pedido == 'agregar':
+                resultado = agregar_valores(arvore.range(*argumentos))
+            elif pedido == 'carregar':
+                # Lê a sua fatia direto da memória compartilhada, sem desserializar nada
+                # O bloco é apenas aberto e fechado aqui: quem o cria e o apaga é o processo principal
+                nome, inicio, fim = argumentos
+                memoria = abrir_memoria_compartilhada(nome)
+                try:
+                    tamanho = arvore.nos.valores.itemsize
+                    visao = memoria.buf[inicio * tamanho:fim * tamanho].cast(tipo_valor)
+                    try:
+                        arvore.bulk_load(visao)
+                    finally:
+                        visao.release()
+                finally:
+                    memoria.close()
+                resultado = len(arvore)
+            elif pedido == 'len':
+                resultado = len(arvore)
+            else:
+                raise ValueError(f"Pedido desconhecido: {pedido}")
+            conexao.send((True, resultado))
+        except Exception as erro:
+            conexao.send((False, erro))
+
+# Função que abre, em um processo de partição, um bloco de memória compartilhada criado pelo processo principal
+# A partir do Python 3.13 o bloco não é registrado no rastreador de recursos (track=False); antes disso, no POSIX,
+# ele é registrado no rastreador herdado do processo principal (ver ARVORE_AVL_PARTICIONADA), que o libera uma vez
+def abrir_memoria_compartilhada(nome):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nome, track=False)
+    return shared_memory.SharedMemory(name=nome)
+
+# Função que resume valores em ordem crescente: quantidade, soma, mínimo e máximo (None se não houver valores)
+def agregar_valores(valores):
+    quantidade, soma, minimo, maximo = 0, 0, None, None
+    for valor in valores:
+        if minimo is None:
+            minimo = valor
+        maximo = valor
+        quantidade += 1
+        soma += valor
+    return {'quantidade': quantidade, 'soma': soma, 'minimo': minimo, 'maximo': maximo}
+
+# Início Classe do contêiner AVL particionado por faixas de chaves, com uma partição por processo
+# As chaves são divididas pelos "limites" (crescentes): a partição i guarda as chaves em [limites[i - 1], limites[i])
+# e pertence a um processo próprio, que mantém uma ARVORE_AVL_COMPACTA; assim cada núcleo trabalha sem disputar o GIL
+# inserir, remover e buscar vão apenas à partição da chave; range e as agregações são enviados a todas as partições
+# que cruzam o intervalo de uma só vez (elas trabalham em paralelo) e os resultados são reunidos em ordem
+# Sem "limites", todas as chaves vão para a primeira partição até que bulk_load divida as chaves em partes iguais
+# Os valores são números de um tipo de array ('q' por padrão), como na ARVORE_AVL_COMPACTA
+class ARVORE_AVL_PARTICIONADA:
+
+    def __init__(self, particoes=None, limites=None, tipo_valor='q'):
+        particoes = particoes or os.cpu_count() or 1
+        self.tipo_valor = tipo_valor
+        self.limites = list(limites) if limites is not None else []
+        if len(self.limites) > particoes - 1:
+            raise ValueError("São necessários no máximo particoes - 1 limites")
+
+        # Uma conexão e um processo por partição
+        # No POSIX, antes do Python 3.13, os processos registram no rastreador de recursos a memória compartilhada que
+        # abrem; ele é iniciado antes, para ser herdado por eles, e assim libera cada bloco uma única vez
+        # (no Windows não há rastreador: o bloco deixa de existir quando o último processo o fecha)
+        if os.name == 'posix' and sys.version_info < (3, 13):
+            resource_tracker.ensure_running()
+        self.conexoes = []
+        self.processos = []
+        for _ in range(particoes):
+            conexao, conexao_processo = Pipe()
+            processo = Process(target=servir_particao, args=(conexao_processo, tipo_valor), daemon=True)
+            processo.start()
+            conexao_processo.close()
+            self.conexoes.append(conexao)
+            self.processos.append(processo)
+
+    # Funções de comunicação com as partições
+
+    # Índice da partição responsável pela chave
+    def particao(self, valor):
+        return bisect.bisect_right(self.limites, valor)
+
+    # Índices das partições que podem conter chaves em [inicio, fim] (None = sem limite)
+    def particoes_do_intervalo(self, inicio, fim):
+        primeira = 0 if inicio is None else self.particao(inicio)
+        ultima = len(self.conexoes) - 1 if fim is None else self.particao(fim)
+        return range(primeira, ultima + 1)
+
+    # Envia o mesmo pedido (ou um pedido por partição) e só então recebe as respostas, na ordem das partições
+    # Enquanto a primeira resposta é aguardada, as demais partições já estão trabalhando
+    def distribuir(self, indices, pedidos):
+        for indice, pedido in zip(indices, pedidos):
+            self.conexoes[indice].send(pedido)
+        return [self.receber(indice) for indice in indices]
+
+    # Recebe a resposta de uma partição, repassando o erro que tenha ocorrido no processo
+    def receber(self, indice):
+        sucesso, resultado = self.conexoes[indice].recv()
+        if not sucesso:
+            raise resultado
+        return resultado
+
+    # Envia um pedido a uma única partição e aguarda a resposta
+    def pedir(self, indice, *pedido):
+        self.conexoes[indice].send(pedido)
+        return self.receber(indice)
+
+    # Funções Básicas, encaminhadas à partição da chave
+
+    def inserir(self, valor):
+        self.pedir(self.particao(valor), 'inserir', valor)
+
+    def remover(self, valor):
+        self.pedir(self.particao(valor), 'remover', valor)
+
+    def buscar(self, valor):
+        return self.pedir(self.particao(valor), 'buscar', valor)
+
+    def __contains__(self, valor):
+        return self.buscar(valor)
+
+    def __len__(self):
+        indices = range(len(self.conexoes))
+        return sum(self.distribuir(indices, [('len',)] * len(indices)))
+
+    # Função que insere um lote de valores: cada partição recebe a sua parte de uma só vez, e todas inserem em paralelo
+    def inserir_lote(self, valores):
+        partes = [[] for _ in self.conexoes]
+        for valor in valores:
+            partes[self.particao(valor)].append(valor)
+        indices = [indice for indice, parte in enumerate(partes) if parte]
+        self.distribuir(indices, [('inserir_lote', partes[indice]) for indice in indices])
+
+    # Função que substitui o conteúdo por "valores" (sem duplicados), com limites que dão o mesmo número de chaves
+    # a cada partição. As chaves ordenadas vão uma única vez para um bloco de memória compartilhada, do qual cada
+    # processo lê a sua fatia e constrói a sua árvore em tempo linear, em paralelo com os demais
+    def bulk_load(self, valores):
+        chaves = array(self.tipo_valor, sorted(set(valores)))
+        quantidade, particoes = len(chaves), len(self.conexoes)
+        cortes = [quantidade * i // particoes for i in range(particoes + 1)]
+        self.limites = [chaves[corte] for corte in cortes[1:-1]] if quantidade else []
+
+        memoria = shared_memory.SharedMemory(create=True, size=max(1, quantidade * chaves.itemsize))
+        try:
+            memoria.buf[:quantidade * chaves.itemsize] = memoryview(chaves).cast('B')
+            indices = range(particoes)
+            self.distribuir(indices, [('carregar', memoria.name, cortes[i], cortes[i + 1]) for i in indices])
+        finally:
+            memoria.close()
+            memoria.unlink()
+
+    # Funções de Intervalo, distribuídas entre as partições
+
+    # Gerador dos valores em [inicio, fim] em ordem crescente (as partições já estão em ordem de chave)
+    def range(self, inicio=None, fim=None):
+        indices = self.particoes_do_intervalo(inicio, fim)
+        for parte in self.distribuir(indices, [('range', inicio, fim)] * len(indices)):
+            yield from parte
+
+    def __iter__(self):
+        return self.range()
+
+    # Função que resume o intervalo [inicio, fim]: {'quantidade', 'soma', 'minimo', 'maximo'}
+    # Cada partição resume a sua parte, e o processo principal só combina os resumos
+    def agregar(self, inicio=None, fim=None):
+        indices = self.particoes_do_intervalo(inicio, fim)
+        total = agregar_valores(())
+        for resumo in self.distribuir(indices, [('agregar', inicio, fim)] * len(indices)):
+            if not resumo['quantidade']:
+                continue
+            if total['minimo'] is None:
+                total['minimo'] = resumo['minimo']
+            total['maximo'] = resumo['maximo']
+            total['quantidade'] += resumo['quantidade']
+            total['soma'] += resumo['soma']
+        return total
+
+    # Quantidade de valores em [inicio, fim]
+    def count_range(self, inicio, fim):
+        return self.agregar(inicio, fim)['quantidade']
+
+    # Encerra os processos das partições
+    def fechar(self):
+        for conexao in self.conexoes:
+            conexao.send(('fechar',))
+            conexao.close()
+        for processo in self.processos:
+            processo.join()
+        self.conexoes, self.processos = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+# Fim classe AVL particionada
+
 # Função que ilustra a Árvore-AVL graficamente, sempre mantendo na última instância
 def ilustrar_Arvore_AVL(novo_no, x=0, y=0, distancia=1, objeto=None, nivel=1):
     # Se o nó atual for None (não existe), a função simplesmente retorna
@@ -351,28 +2796,238 @@ def ilustrar_Arvore_AVL(novo_no, x=0, y=0, distancia=1, objeto=None, nivel=1):
     # "bbox": Configura o estilo da "Bolinha" ao redor do texto
     objeto.text(x, y, str(novo_no.valor), size=12, ha='center', bbox=dict(boxstyle='circle', facecolor='white', edgecolor='black'))
 
+# Início Classe que desenha a Árvore-AVL de forma incremental
+# Os desenhos são criados uma única vez e mantidos entre as atualizações: um texto por nó, e os círculos e as arestas
+# em duas coleções (desenhá-las juntas custa quase o mesmo que desenhar uma única linha). A cada atualização apenas os
+# textos de nós novos, movidos ou com o valor trocado são alterados, e o canvas é atualizado por "blitting"
+#
+# Layout: cada nó fica na coluna igual à sua posição em ordem (quantos valores são menores que ele) e na linha igual à
+# sua profundidade, então nenhum nó se sobrepõe. A coluna sai dos tamanhos das subárvores (mantidos pela própria árvore
+# com estatisticas_de_ordem=True, inclusive nas rotações), e só as subárvores dentro da área visível são percorridas.
+#
+# Nível de detalhe: uma subárvore estreita demais na tela para mostrar os seus nós é desenhada como um único resumo
+# (quantidade de nós e altura). Clicar em um resumo o expande, clicar em um nó expandido o recolhe, a rolagem do
+# mouse aplica zoom em torno do cursor e o botão direito volta a enquadrar a árvore inteira.
+class RENDERIZADOR_AVL:
+    LARGURA_MINIMA = 60 # Largura mínima (em pixels) de uma subárvore para que seus nós sejam desenhados um a um
+    ZOOM = 1.5 # Fator de zoom por passo da rolagem
+
+    def __init__(self, eixo, desenho):
+        self.eixo = eixo
+        self.desenho = desenho
+        self.raiz = None
+        self.textos = {} # id(nó) -> [nó, texto, posição, rótulo], para os nós desenhados um a um
+        self.resumos = {} # id(nó) -> [nó, texto, posição, rótulo], para as subárvores recolhidas
+        self.expandidos = {} # id(nó) -> nó, subárvores que o usuário expandiu
+        self.circulos = eixo.scatter([], [], s=500, facecolors='white', edgecolors='black', zorder=2, animated=True)
+        self.arestas = LineCollection([], colors='black', linewidths=1, zorder=1, animated=True)
+        eixo.add_collection(self.arestas)
+        self.fundo = None # Imagem do eixo vazio, restaurada antes de cada quadro
+        self.ajustar_vista = True # Enquanto verdadeiro, os limites do eixo acompanham a árvore inteira
+        self.colunas = 0 # Colunas enquadradas pela vista automática (uma potência de 2, ver ajustar_limites)
+
+        # A cada desenho completo (primeira vez, redimensionamento, mudança de limites) o fundo é capturado novamente
+        self.desenho.mpl_connect('draw_event', self.ao_desenhar)
+        self.desenho.mpl_connect('scroll_event', self.ao_rolar)
+        self.desenho.mpl_connect('button_press_event', self.ao_clicar)
+
+    # Função que calcula as posições apenas do que está na área visível do eixo (percurso com pilha)
+    # Retorna os nós desenhados um a um e os resumos, ambos como {id(nó): (nó, x, y)}, e os segmentos das arestas
+    def calcular_layout(self, raiz):
+        posicoes, resumos, segmentos = {}, {}, []
+        if not raiz:
+            return posicoes, resumos, segmentos
+
+        tamanho = self.tamanho
+        (x0, x1), (y0, y1) = sorted(self.eixo.get_xlim()), sorted(self.eixo.get_ylim())
+        pixels_por_coluna = self.eixo.bbox.width / max(x1 - x0, 1e-9)
+
+        # Cada item: (nó, primeira coluna da sua subárvore, profundidade)
+        pilha = [(raiz, 0, 0)]
+        while pilha:
+            no, inicio, profundidade = pilha.pop()
+            x, y = inicio + tamanho(no.esquerda), -profundidade
+
+            # Subárvore inteira fora da área visível (à esquerda, à direita ou abaixo)
+            if inicio + tamanho(no) - 1 < x0 or inicio > x1 or y < y0:
+                continue
+
+            # Subárvore estreita demais: vira um resumo, a não ser que o usuário a tenha expandido
+            if (no.esquerda or no.direita) and id(no) not in self.expandidos and \
+                    tamanho(no) * pixels_por_coluna < self.LARGURA_MINIMA:
+                resumos[id(no)] = (no, x, y)
+                continue
+
+            # O nó só é desenhado se estiver na área visível, mas a descida continua (os filhos podem estar nela)
+            if x0 <= x <= x1 and y <= y1:
+                posicoes[id(no)] = (no, x, y)
+            if no.esquerda:
+                filho_x = inicio + tamanho(no.esquerda.esquerda)
+                segmentos.append(((x, y), (filho_x, y - 1)))
+                pilha.append((no.esquerda, inicio, profundidade + 1))
+            if no.direita:
+                filho_x = x + 1 + tamanho(no.direita.esquerda)
+                segmentos.append(((x, y), (filho_x, y - 1)))
+                pilha.append((no.direita, x + 1, profundidade + 1))
+
+        return posicoes, resumos, segmentos
+
+    # Função que retorna a função de tamanho das subárvores: o campo "tamanho" dos nós quando a árvore tem
+    # estatísticas de ordem, ou então tamanhos calculados agora, em uma única passada (O(n))
+    # (só os nós das árvores com estatísticas de ordem têm o campo "tamanho", que é sempre mantido)
+    def funcao_tamanho(self, raiz):
+        if not raiz or hasattr(raiz, 'tamanho'):
+            return lambda no: no.tamanho if no else 0
+
+        tamanhos = {}
+        pilha = [(raiz, False)]
+        while pilha:
+            no, filhos_prontos = pilha.pop()
+            if filhos_prontos:
+                tamanhos[id(no)] = 1 + tamanhos.get(id(no.esquerda), 0) + tamanhos.get(id(no.direita), 0)
+                continue
+            pilha.append((no, True))
+            for filho in (no.esquerda, no.direita):
+                if filho:
+                    pilha.append((filho, False))
+        return lambda no: tamanhos[id(no)] if no else 0
+
+    # Função que sincroniza os desenhos com a árvore atual e atualiza o canvas
+    def atualizar(self, raiz):
+        self.raiz = raiz
+        self.tamanho = self.funcao_tamanho(raiz)
+
+        # Se os limites do eixo mudarem, é preciso um desenho completo (que recaptura o fundo)
+        if self.ajustar_limites(raiz):
+            self.fundo = None
+
+        self.aplicar_layout(*self.calcular_layout(raiz))
+        self.quadro()
+
+    # Função que aplica um layout aos desenhos, alterando apenas os textos que mudaram
+    def aplicar_layout(self, posicoes, resumos, segmentos):
+        self.sincronizar_textos(self.textos, posicoes, lambda no: str(no.valor), None)
+        self.sincronizar_textos(self.resumos, resumos, lambda no: f"{self.tamanho(no)} nós\nh={no.altura}",
+                                dict(boxstyle='round', facecolor='lightgray', edgecolor='black'))
+
+        # Os círculos e as arestas são atualizados de uma vez nas coleções
+        self.circulos.set_offsets([(x, y) for _, x, y in posicoes.values()] or np.empty((0, 2)))
+        self.arestas.set_segments(segmentos)
+
+    # Função que cria, move, troca o rótulo ou remove os textos de "artistas" para refletir "posicoes"
+    def sincronizar_textos(self, artistas, posicoes, rotular, caixa):
+        for chave in [chave for chave in artistas if chave not in posicoes]:
+            artistas.pop(chave)[1].remove()
+
+        for chave, (no, x, y) in posicoes.items():
+            artista = artistas.get(chave)
+            rotulo = rotular(no)
+            if artista is None:
+                texto = self.eixo.text(x, y, rotulo, size=12 if caixa is None else 9, ha='center', va='center',
+                                       zorder=3, animated=True, clip_on=True, bbox=caixa)
+                artistas[chave] = [no, texto, (x, y), rotulo]
+                continue
+            if artista[2] != (x, y):
+                artista[1].set_position((x, y))
+                artista[2] = (x, y)
+            if artista[3] != rotulo:
+                artista[1].set_text(rotulo)
+                artista[3] = rotulo
+
+    # Função que enquadra as linhas 0 a -(altura - 1) e, se a vista acompanha a árvore inteira, as colunas 0 a n - 1
+    # Na vista automática, as colunas enquadradas são uma potência de 2 maior ou igual a n, refeita apenas quando a árvore
+    # deixa de caber ou passa a ocupar menos de um quarto dela; assim os limites só mudam O(log n) vezes ao longo das
+    # inserções e remoções (assim como a altura), e os demais quadros saem por "blitting"
+    # Retorna se os limites mudaram
+    def ajustar_limites(self, raiz):
+        if not raiz:
+            return False
+        if self.ajustar_vista:
+            tamanho = self.tamanho(raiz)
+            if tamanho > self.colunas or 4 * tamanho < self.colunas:
+                self.colunas = 1 << (tamanho - 1).bit_length()
+            colunas = (-0.5, self.colunas - 0.5)
+        else:
+            colunas = self.eixo.get_xlim()
+        limites = (colunas, (-raiz.altura + 0.5, 0.5))
+        if limites == (self.eixo.get_xlim(), self.eixo.get_ylim()):
+            return False
+        self.eixo.set_xlim(*limites[0])
+        self.eixo.set_ylim(*limites[1])
+        return True
+
+    # Função que desenha um quadro: restaura o fundo, desenha a árvore e faz o "blit" do eixo
+    def quadro(self):
+        if self.fundo is None:
+            # O desenho completo dispara "ao_desenhar", que captura o fundo e desenha a árvore
+            self.desenho.draw()
+            return
+        self.desenho.restore_region(self.fundo)
+        self.desenhar_artistas()
+        self.desenho.blit(self.eixo.bbox)
+
+    # Função chamada após cada desenho completo do canvas
+    def ao_desenhar(self, evento):
+        self.fundo = self.desenho.copy_from_bbox(self.eixo.bbox)
+        self.desenhar_artistas()
+
+    # Função que desenha as arestas, os círculos e, por cima, os textos e os resumos
+    def desenhar_artistas(self):
+        self.eixo.draw_artist(self.arestas)
+        self.eixo.draw_artist(self.circulos)
+        for artistas in (self.textos, self.resumos):
+            for _, texto, _, _ in artistas.values():
+                self.eixo.draw_artist(texto)
+
+    # Rolagem do mouse: zoom horizontal em torno do cursor (a vista deixa de acompanhar a árvore inteira)
+    # Na vertical todas as linhas continuam visíveis, pois a altura de uma árvore AVL é logarítmica
+    def ao_rolar(self, evento):
+        if evento.inaxes is not self.eixo:
+            return
+        fator = 1 / self.ZOOM if evento.button == 'up' else self.ZOOM
+        x0, x1 = self.eixo.get_xlim()
+        self.eixo.set_xlim(evento.xdata + (x0 - evento.xdata) * fator, evento.xdata + (x1 - evento.xdata) * fator)
+        self.ajustar_vista = False
+        self.fundo = None
+        self.atualizar(self.raiz)
+
+    # Clique: o botão esquerdo expande um resumo ou recolhe um nó expandido; o direito volta à vista inteira
+    def ao_clicar(self, evento):
+        if evento.inaxes is not self.eixo:
+            return
+        if evento.button == 3:
+            self.expandidos.clear()
+            self.ajustar_vista = True
+            self.atualizar(self.raiz)
+            return
+        if evento.button != 1:
+            return
+
+        # O item mais próximo do clique, dentro de meia coluna e meia linha
+        for artistas, expandir in ((self.resumos, True), (self.textos, False)):
+            for chave, (no, _, (x, y), _) in artistas.items():
+                if abs(x - evento.xdata) <= 0.5 and abs(y - evento.ydata) <= 0.5:
+                    if expandir:
+                        self.expandidos[chave] = no
+                    elif self.expandidos.pop(chave, None) is None:
+                        continue
+                    self.atualizar(self.raiz)
+                    return
+# Fim Classe RENDERIZADOR_AVL
+
 # Início Classe para a interface
 class INTERFACE_ARVORE_AVL:
 
     # Função responsável por atualizar a representação gráfica da Árvore-AVL
+    # É assinada na árvore no modo 'coalescido': um único redesenho por operação (ou lote), e não por nível
     def atualizar_AVL(self):
-        # Limpa o gráfico atual, removendo qualquer desenho ou marcações anteriores
-        self.eixo.clear()
-        # Remove os eixos do gráfico para que fique visualmente mais limpo
-        self.eixo.axis('off')
-
-        # Desenha a árvore AVL atual no gráfico, começando pela raiz
-        ilustrar_Arvore_AVL(self.raiz, objeto=self.eixo)
-
-        # "Canvas" é conceito que define o que realiza a ligação entre gráfico e interface
-        # Enquanto o método draw atualiza o desenho no canvas com o estado mais recente
-        self.desenho.draw()
+        # Sincroniza o desenho com a árvore atual: só os nós e arestas que mudaram são alterados,
+        # e o "Canvas" (ligação entre gráfico e interface) é atualizado por blitting
+        self.renderizador.atualizar(self.raiz)
         
         # Atualiza a janela para refletir as mudanças feitas no gráfico
         self.janela.update()
 
-        time.sleep(0.5)  # Pausa para criar o efeito de transição e suavização 
-
     # Função responsável por atualizar o histórico de operações feitas
     def atualizar_historico(self, mensagem):
         # Permite que o conteúdo do histórico seja editado pela função configure
@@ -394,14 +3049,13 @@ class INTERFACE_ARVORE_AVL:
             valor = int(self.entrada.get())
             
             # Chama a função de inserção na árvore AVL e atualiza a raiz com o novo nó
-            self.raiz = self.arvore.inserir(self.raiz, valor)
+            # Os eventos são agrupados para que o gráfico seja redesenhado uma vez, já com a nova raiz
+            with self.arvore.agrupar_eventos():
+                self.raiz = self.arvore.inserir(self.raiz, valor)
             
             # Atualiza o histórico registrando a operação de inserção
             self.atualizar_historico(f"Inserção do valor: {valor}")
             
-            # Atualiza o gráfico após a mudança
-            self.atualizar_AVL()
-            
         except ValueError:  # Se ocorrer um erro de conversão (Caso o valor não seja um inteiro)
             # Registra no histórico a tentativa de inserção inválida
             self.atualizar_historico("Tentativa de entrada inválida!")
@@ -419,17 +3073,17 @@ class INTERFACE_ARVORE_AVL:
                 self.atualizar_historico(f"Valor {valor} não encontrado para remoção.")
                 return  # Retorna sem fazer nada se o valor não for encontrado
 
-            # Tenta remover o valor da árvore, atualizando a raiz da árvore
-            self.raiz = self.arvore.remover(self.raiz, valor)
+            # Tenta remover o valor da árvore, atualizando a raiz da árvore (o gráfico é redesenhado ao final do agrupamento)
+            with self.arvore.agrupar_eventos():
+                self.raiz = self.arvore.remover(self.raiz, valor)
             
             # Verifica se o valor ainda está presente após a remoção
             if self.arvore.buscar(self.raiz, valor):
                 # Caso o valor ainda exista, registra um erro no histórico
                 self.atualizar_historico(f"Erro: Não foi possível remover o valor {valor}.")
             else:
-                # Senão, confirma a remoção no histórico e atualiza a árvore
+                # Senão, confirma a remoção no histórico
                 self.atualizar_historico(f"Remoção do valor {valor} concluída.")
-                self.atualizar_AVL()
         
         except ValueError: # Caso a entrada seja inválida, registra no histórico
             self.atualizar_historico("Tentativa de remoção inválida!")
@@ -489,6 +3143,9 @@ class INTERFACE_ARVORE_AVL:
         self.desenho = FigureCanvasTkAgg(self.bolinha, master=self.bloco_retangulo) # Vincula o gráfico ao 'Frame' para ser mostrado na interface
         self.desenho.get_tk_widget().pack()  # Exibe o widget no layout, tornando o gráfico visível na tela
 
+        # Renderizador incremental, que mantém os desenhos de cada nó entre as atualizações
+        self.renderizador = RENDERIZADOR_AVL(self.eixo, self.desenho)
+
         # Criação do campo de entrada para o usuário inserir um valor
         self.entrada = tk.Entry(self.bloco_de_controle) # Cria um campo de texto onde o usuário pode digitar um valor
         self.entrada.pack(side=tk.LEFT) # Posiciona o campo de entrada à esquerda dentro do 'Frame' de controles
@@ -511,13 +3168,599 @@ class INTERFACE_ARVORE_AVL:
         
         # Inicialização da árvore AVL 
         # Cria a árvore AVL, passando funções de atualização do gráfico e do histórico
-        self.arvore = ARVORE_AVL(update_arvore=self.atualizar_AVL, update_historico=self.atualizar_historico)
+        # As estatísticas de ordem mantêm o tamanho das subárvores, usado pelo layout do renderizador
+        self.arvore = ARVORE_AVL(update_arvore=self.atualizar_AVL, update_historico=self.atualizar_historico,
+                                 estatisticas_de_ordem=True)
         self.raiz = None  # Inicializa a raiz da árvore como None, indicando que a árvore começa vazia
         
 # Fim Classe da interface
 
+# Início Funções de Benchmark
+# Executadas sem a interface gráfica: python "Implementação python Arvores AVL.py" --benchmark [opções]
+# Cada execução (estrutura, carga, tamanho n) passa pelas fases: 'inserir' (as n chaves iniciais na ordem da carga),
+# 'mistura' (buscas, inserções e remoções, uma vez para cada proporção de leituras) e 'remover' (todas as chaves restantes)
+# O resultado é um JSON, que pode ser comparado com uma execução de referência para barrar regressões
+# Como no timeit.repeat, o plano inteiro é repetido em estruturas novas; cada fase fica com a repetição de vazão
+# mediana, que é o número comparado (a melhor vazão, sensível a janelas ocasionais de máquina ociosa, também é registrada)
+
+CARGAS_BENCHMARK = ('aleatoria', 'ordenada', 'reversa', 'zipf')
+LEITURAS_BENCHMARK = (1.0, 0.9, 0.5) # Proporções de buscas nas fases de mistura
+REPETICOES_BENCHMARK = 5 # Execuções cronometradas de cada plano
+EXPOENTE_ZIPF = 1.1
+INSERIR, BUSCAR, REMOVER = 0, 1, 2 # Códigos das operações (índices na tupla de funções de cada estrutura)
+
+# Funções que adaptam cada estrutura às operações (inserir, buscar, remover), sempre chamadas com uma chave
+# Retornam também a árvore (ou None nas referências), usada na contagem das rotações
+
+def operacoes_arvore(arvore):
+    def inserir(chave):
+        arvore.raiz = arvore.inserir(arvore.raiz, chave)
+    def buscar(chave):
+        return arvore.buscar(arvore.raiz, chave)
+    def remover(chave):
+        arvore.raiz = arvore.remover(arvore.raiz, chave)
+    return arvore, (inserir, buscar, remover)
+
+# Referência: lista ordenada mantida com o módulo bisect (busca O(log n), mas inserção e remoção O(n))
+def operacoes_bisect():
+    lista = []
+    def inserir(chave):
+        bisect.insort(lista, chave)
+    def buscar(chave):
+        i = bisect.bisect_left(lista, chave)
+        return i < len(lista) and lista[i] == chave
+    def remover(chave):
+        i = bisect.bisect_left(lista, chave)
+        if i < len(lista) and lista[i] == chave:
+            del lista[i]
+    return None, (inserir, buscar, remover)
+
+# Referência: dicionário (sem ordem, O(1) em média), o limite superior do que uma busca em Python pode custar
+def operacoes_dict():
+    dicionario = {}
+    def inserir(chave):
+        dicionario[chave] = None
+    def buscar(chave):
+        return chave in dicionario
+    def remover(chave):
+        dicionario.pop(chave, None)
+    return None, (inserir, buscar, remover)
+
+# Referência opcional: SortedList do pacote sortedcontainers
+def operacoes_sortedlist():
+    lista = SortedList()
+    def inserir(chave):
+        lista.add(chave)
+    def buscar(chave):
+        return chave in lista
+    def remover(chave):
+        lista.discard(chave)
+    return None, (inserir, buscar, remover)
+
+# Estruturas disponíveis no benchmark (nome -> fábrica que cria uma estrutura vazia)
+ESTRUTURAS_BENCHMARK = {
+    'ARVORE_AVL': lambda: operacoes_arvore(ARVORE_AVL()),
+    'ARVORE_AVL_COMPACTA': lambda: operacoes_arvore(ARVORE_AVL_COMPACTA(tipo_valor='q')),
+    'bisect': operacoes_bisect,
+    'dict': operacoes_dict,
+}
+if SortedList is not None:
+    ESTRUTURAS_BENCHMARK['sortedcontainers'] = operacoes_sortedlist
+
+# Função que ordena as chaves na sequência de uma carga: crescente, decrescente ou embaralhada ('aleatoria' e 'zipf')
+def ordenar_por_carga(carga, chaves, gerador):
+    chaves = sorted(chaves, reverse=(carga == 'reversa'))
+    if carga in ('aleatoria', 'zipf'):
+        gerador.shuffle(chaves)
+    return chaves
+
+# Função que prepara a distribuição de Zipf do universo: (chaves em ordem de popularidade, pesos acumulados)
+# As chaves quentes são espalhadas pela árvore por um embaralhamento; os dois vetores são criados uma única vez por plano
+def preparar_zipf(universo, gerador):
+    populares = array('q', range(universo))
+    gerador.shuffle(populares)
+    acumulado = array('d', accumulate(posicao ** -EXPOENTE_ZIPF for posicao in range(1, universo + 1)))
+    return populares, acumulado
+
+# Função que sorteia "quantidade" chaves entre 0 e universo - 1 seguindo a carga
+# 'ordenada' e 'reversa' varrem o universo em ordem; em 'zipf', a popularidade segue uma lei de Zipf
+# (poucas chaves quentes, espalhadas pela árvore, recebem a maior parte dos acessos), dada por preparar_zipf()
+def sortear_chaves(carga, universo, quantidade, gerador, zipf=None):
+    if carga == 'aleatoria':
+        return [gerador.randrange(universo) for _ in range(quantidade)]
+    if carga == 'ordenada':
+        return [i * universo // quantidade for i in range(quantidade)]
+    if carga == 'reversa':
+        return [universo - 1 - i * universo // quantidade for i in range(quantidade)]
+
+    populares, acumulado = zipf or preparar_zipf(universo, gerador)
+    return gerador.choices(populares, cum_weights=acumulado, k=quantidade)
+
+# Função que monta as operações de uma mistura com a proporção "leituras" de buscas
+# Cada escrita alterna a presença da chave sorteada (remove se existir, insere se não), simulada no conjunto "presentes"
+def gerar_mistura(carga, universo, quantidade, leituras, presentes, gerador, zipf=None):
+    codigos, chaves = bytearray(), array('q')
+    for chave in sortear_chaves(carga, universo, quantidade, gerador, zipf):
+        if gerador.random() < leituras:
+            codigos.append(BUSCAR)
+        elif chave in presentes:
+            presentes.discard(chave)
+            codigos.append(REMOVER)
+        else:
+            presentes.add(chave)
+            codigos.append(INSERIR)
+        chaves.append(chave)
+    return codigos, chaves
+
+# Função que planeja as fases de uma execução, como tuplas (fase, leituras, códigos, chaves)
+# As chaves iniciais são os pares de 0 a 2n - 2 e as misturas sorteiam entre 0 e 2n - 1, então metade das buscas falha
+# O plano é gerado uma única vez por carga e tamanho, e repetido de forma idêntica em todas as estruturas
+def planejar_fases(carga, tamanho, quantidade, leituras, semente):
+    gerador = random.Random(semente)
+    presentes = set(range(0, 2 * tamanho, 2))
+
+    chaves = array('q', ordenar_por_carga(carga, presentes, gerador))
+    fases = [('inserir', None, bytes([INSERIR]) * len(chaves), chaves)]
+    zipf = preparar_zipf(2 * tamanho, gerador) if carga == 'zipf' and leituras else None
+    for proporcao in leituras:
+        fases.append(('mistura', proporcao,
+                      *gerar_mistura(carga, 2 * tamanho, quantidade, proporcao, presentes, gerador, zipf)))
+    chaves = array('q', ordenar_por_carga(carga, presentes, gerador))
+    fases.append(('remover', None, bytes([REMOVER]) * len(chaves), chaves))
+    return fases
+
+# Função que executa uma fase cronometrando cada operação, retornando a vazão e as latências p50 e p99 (em nanossegundos)
+# O coletor de lixo fica desligado durante a medição, como no módulo timeit
+def medir_fase(funcoes, codigos, chaves):
+    relogio = time.perf_counter_ns
+    latencias = [0] * len(chaves)
+    coletor_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        inicio = relogio()
+        for i, (codigo, chave) in enumerate(zip(codigos, chaves)):
+            funcao = funcoes[codigo]
+            t0 = relogio()
+            funcao(chave)
+            latencias[i] = relogio() - t0
+        total = relogio() - inicio
+    finally:
+        if coletor_ativo:
+            gc.enable()
+
+    latencias.sort()
+    return {
+        'ops_por_segundo': round(len(chaves) / (total / 1e9)) if total else None,
+        'p50_ns': percentil(latencias, 0.50),
+        'p99_ns': percentil(latencias, 0.99),
+    }
+
+# Função que retorna o percentil "p" (entre 0 e 1) de uma lista já ordenada
+def percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+# Função que repete as fases sem cronometrar, medindo o pico de memória da estrutura (tracemalloc)
+# e contando as rotações de cada fase por meio dos eventos da árvore (None nas estruturas de referência)
+# Fica separada da medição de tempo, pois o tracemalloc e os eventos deixam as operações bem mais lentas
+def instrumentar(fabrica, fases):
+    rotacoes = [0]
+    def contar(eventos):
+        for evento in eventos:
+            if evento.tipo == 'rotacao':
+                rotacoes[0] += 1
+
+    tracemalloc.start()
+    try:
+        arvore, funcoes = fabrica()
+        if arvore is not None:
+            arvore.assinar(contar)
+        por_fase = []
+        for _, _, codigos, chaves in fases:
+            antes = rotacoes[0]
+            for codigo, chave in zip(codigos, chaves):
+                funcoes[codigo](chave)
+            por_fase.append(None if arvore is None else rotacoes[0] - antes)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return pico, por_fase
+
+# Função que executa o benchmark completo, retornando um dicionário pronto para ser gravado em JSON
+# Cada resultado identifica a execução por (estrutura, carga, tamanho, fase, leituras)
+# "ops_por_segundo" (e as latências) vêm da repetição mediana das "repeticoes" execuções do plano
+# (a instrumentação, que executa o plano antes de todas elas, serve de aquecimento)
+def executar_benchmark(tamanhos, cargas=CARGAS_BENCHMARK, estruturas=None, leituras=LEITURAS_BENCHMARK,
+                       operacoes=None, semente=0, progresso=None, repeticoes=REPETICOES_BENCHMARK):
+    estruturas = list(ESTRUTURAS_BENCHMARK) if estruturas is None else estruturas
+    resultados = []
+    for tamanho in tamanhos:
+        for carga in cargas:
+            fases = planejar_fases(carga, tamanho, operacoes or tamanho, leituras, semente)
+            instrumentacao = {nome: instrumentar(ESTRUTURAS_BENCHMARK[nome], fases) for nome in estruturas}
+
+            # Cada repetição usa estruturas novas, sem assinantes, e passa por todas as fases em ordem
+            # As repetições das estruturas se alternam, espalhando as amostras de cada uma pelo tempo da execução
+            medidas = {nome: [[] for _ in fases] for nome in estruturas}
+            for _ in range(max(1, repeticoes)):
+                for nome in estruturas:
+                    _, funcoes = ESTRUTURAS_BENCHMARK[nome]()
+                    for medidas_fase, (_, _, codigos, chaves) in zip(medidas[nome], fases):
+                        medidas_fase.append(medir_fase(funcoes, codigos, chaves))
+
+            for nome in estruturas:
+                pico, rotacoes = instrumentacao[nome]
+                for (fase, proporcao, codigos, chaves), rotacoes_fase, medidas_fase in zip(fases, rotacoes, medidas[nome]):
+                    medidas_fase.sort(key=lambda medida: medida['ops_por_segundo'] or 0)
+                    medida = medidas_fase[len(medidas_fase) // 2]
+                    resultados.append({
+                        'estrutura': nome, 'carga': carga, 'tamanho': tamanho, 'fase': fase, 'leituras': proporcao,
+                        'operacoes': len(chaves), **medida,
+                        'ops_por_segundo_melhor': medidas_fase[-1]['ops_por_segundo'],
+                        'repeticoes': len(medidas_fase),
+                        'rotacoes': rotacoes_fase, 'memoria_pico_bytes': pico,
+                    })
+                    if progresso:
+                        progresso(f"{nome:20} {carga:9} n={tamanho:<9} {fase:8} {proporcao or '':4} "
+                                  f"{medida['ops_por_segundo']:>10} ops/s  p99 {medida['p99_ns']} ns")
+
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'semente': semente,
+        'repeticoes': max(1, repeticoes),
+        'resultados': resultados,
+    }
+
+# Função que compara um benchmark com uma execução de referência, retornando a lista de regressões encontradas
+# Regressão: vazão mediana das repetições abaixo de (1 - tolerancia) vezes a da referência,
+# ou pico de memória acima de (1 + tolerancia) vezes
+def comparar_benchmarks(atual, referencia, tolerancia=0.1):
+    def identificar(resultado):
+        return (resultado['estrutura'], resultado['carga'], resultado['tamanho'], resultado['fase'], resultado['leituras'])
+
+    anteriores = {identificar(resultado): resultado for resultado in referencia['resultados']}
+    regressoes = []
+    for resultado in atual['resultados']:
+        anterior = anteriores.get(identificar(resultado))
+        if anterior is None:
+            continue
+        nome = ' '.join(str(parte) for parte in identificar(resultado) if parte is not None)
+        if resultado['ops_por_segundo'] < anterior['ops_por_segundo'] * (1 - tolerancia):
+            regressoes.append(f"{nome}: {resultado['ops_por_segundo']} ops/s (referência {anterior['ops_por_segundo']})")
+        # A memória é a mesma em todas as fases de uma execução, então é comparada uma só vez
+        if resultado['fase'] == 'inserir' and resultado['memoria_pico_bytes'] > anterior['memoria_pico_bytes'] * (1 + tolerancia):
+            regressoes.append(f"{nome}: pico de {resultado['memoria_pico_bytes']} bytes (referência {anterior['memoria_pico_bytes']})")
+    return regressoes
+
+# Função de linha de comando do benchmark; retorna o código de saída (1 se houver regressões em relação a "--referencia")
+def principal_benchmark(argumentos):
+    def lista_de(tipo):
+        return lambda texto: [tipo(parte) for parte in texto.split(',')]
+
+    parser = argparse.ArgumentParser(description="Benchmark das operações da árvore AVL, sem a interface gráfica")
+    parser.add_argument('--benchmark', action='store_true', help="executa o benchmark em vez da interface")
+    parser.add_argument('--tamanhos', type=lista_de(lambda parte: int(float(parte))), default=[10**3, 10**4, 10**5],
+                        help="tamanhos das árvores, por exemplo 1e3,1e5,1e7 (padrão: 1e3,1e4,1e5)")
+    parser.add_argument('--cargas', type=lista_de(str), default=list(CARGAS_BENCHMARK),
+                        help=f"cargas entre {','.join(CARGAS_BENCHMARK)}")
+    parser.add_argument('--estruturas', type=lista_de(str), default=None,
+                        help=f"estruturas entre {','.join(ESTRUTURAS_BENCHMARK)} (bisect é O(n) por escrita: evite-o em 1e7)")
+    parser.add_argument('--leituras', type=lista_de(float), default=list(LEITURAS_BENCHMARK),
+                        help="proporções de buscas das misturas (padrão: 1.0,0.9,0.5)")
+    parser.add_argument('--operacoes', type=lambda parte: int(float(parte)), default=None,
+                        help="operações por mistura (padrão: o tamanho da árvore)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_BENCHMARK,
+                        help=f"execuções cronometradas de cada plano, vale a melhor (padrão: {REPETICOES_BENCHMARK})")
+    parser.add_argument('--saida', help="arquivo JSON de saída (padrão: saída padrão)")
+    parser.add_argument('--referencia', help="JSON de uma execução anterior, para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=0.1, help="variação aceita em relação à referência (padrão: 0.1)")
+    opcoes = parser.parse_args(argumentos)
+
+    for nome in opcoes.estruturas or []:
+        if nome not in ESTRUTURAS_BENCHMARK:
+            parser.error(f"estrutura desconhecida: {nome}")
+    for carga in opcoes.cargas:
+        if carga not in CARGAS_BENCHMARK:
+            parser.error(f"carga desconhecida: {carga}")
+
+    resultado = executar_benchmark(opcoes.tamanhos, opcoes.cargas, opcoes.estruturas, opcoes.leituras,
+                                   opcoes.operacoes, opcoes.semente, progresso=lambda linha: print(linha, file=sys.stderr),
+                                   repeticoes=opcoes.repeticoes)
+    if opcoes.saida:
+        with open(opcoes.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    else:
+        json.dump(resultado, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+    if opcoes.referencia:
+        with open(opcoes.referencia, encoding='utf-8') as arquivo:
+            regressoes = comparar_benchmarks(resultado, json.load(arquivo), opcoes.tolerancia)
+        for regressao in regressoes:
+            print(f"Regressão: {regressao}", file=sys.stderr)
+        if regressoes:
+            return 1
+    return 0
+# Fim Funções de Benchmark
+
+# Início Servidor
+# Executado sem a interface gráfica: python "Implementação python Arvores AVL.py" --servidor [--porta P | --unix CAMINHO]
+# Protocolo em linhas de texto (UTF-8): cada pedido é uma linha e recebe exatamente uma linha de resposta, na mesma
+# ordem, então um cliente pode enviar vários pedidos seguidos sem esperar as respostas. As chaves são inteiros e os
+# dados, palavras sem espaços ("*" em RANGE significa sem limite):
+#   GET k1 k2 ...              -> OK k1 d1 k2 d2 ...  (apenas as chaves presentes, na ordem pedida)
+#   PUT k1 d1 k2 d2 ...        -> OK n                (n pares gravados)
+#   DEL k1 k2 ...              -> OK n                (n chaves removidas)
+#   RANGE inicio fim [limite]  -> OK k1 d1 k2 d2 ...  (em ordem crescente, no máximo "limite" pares, limite >= 1)
+#   LEN                        -> OK n
+# Um pedido inválido recebe "ERR mensagem", sem fechar a conexão
+# Os pedidos de todas as conexões entram em uma única fila, atendida por uma única tarefa: cada sequência de PUTs ou de
+# DELs consecutivos vira uma só operação em lote na árvore (atualizar_lote / remover_lote), e as leituras são
+# respondidas na sua vez, então cada pedido enxerga todas as escritas recebidas antes dele
+# Contrapressão: a fila e as respostas pendentes de cada conexão são limitadas; quando uma delas enche, o servidor
+# para de ler da conexão, e o controle de fluxo do próprio socket freia o cliente
+
+PORTA_SERVIDOR = 7480
+LIMITE_RANGE_SERVIDOR = 1000 # Pares por RANGE: o padrão, quando o pedido não informa o limite, e o máximo
+
+class SERVIDOR_AVL:
+
+    def __init__(self, arvore=None, tamanho_fila=4096, pendentes_por_conexao=256, lote_maximo=4096):
+        # A árvore fica no modo mapa, com estatísticas de ordem para que LEN seja O(1)
+        self.arvore = arvore if arvore is not None else ARVORE_AVL(estatisticas_de_ordem=True, mapa=True)
+        self.tamanho_fila = tamanho_fila
+        self.pendentes_por_conexao = pendentes_por_conexao
+        self.lote_maximo = lote_maximo # Pedidos retirados da fila de uma vez
+        self.fila = None               # Criada em iniciar(), dentro do loop de eventos
+        self.atendente = None
+        self.ouvintes = []
+        self.conexoes = set()          # Tarefas das conexões abertas
+
+    # Abre o socket (TCP em host:porta ou, com "unix", um socket Unix) e inicia a tarefa que atende a fila
+    async def iniciar(self, host='127.0.0.1', porta=PORTA_SERVIDOR, unix=None):
+        if self.fila is None:
+            self.fila = asyncio.Queue(self.tamanho_fila)
+            self.atendente = asyncio.create_task(self.atender_fila())
+        if unix:
+            ouvinte = await asyncio.start_unix_server(self.atender_conexao, unix)
+        else:
+            ouvinte = await asyncio.start_server(self.atender_conexao, host, porta)
+        self.ouvintes.append(ouvinte)
+        return ouvinte
+
+    # Para de aceitar conexões, abandona as conexões abertas e encerra a tarefa da fila
+    async def fechar(self):
+        for ouvinte in self.ouvintes:
+            ouvinte.close()
+        self.ouvintes.clear()
+        for conexao in list(self.conexoes):
+            conexao.cancel()
+        await asyncio.gather(*self.conexoes, return_exceptions=True)
+        if self.atendente is not None:
+            self.atendente.cancel()
+            try:
+                await self.atendente
+            except asyncio.CancelledError:
+                pass
+            self.atendente = self.fila = None
+
+    # Funções de Conexão
+
+    # Lê os pedidos de uma conexão, reservando para cada um a sua resposta (um futuro) na ordem de chegada
+    # As duas esperas ("put") são a contrapressão: sem vaga, a leitura da conexão fica parada
+    async def atender_conexao(self, leitor, escritor):
+        tarefa = asyncio.current_task()
+        self.conexoes.add(tarefa)
+        respostas = asyncio.Queue(self.pendentes_por_conexao)
+        enviando = asyncio.create_task(self.enviar_respostas(respostas, escritor))
+        laco = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    linha = await leitor.readline()
+                except ValueError: # Linha maior que o limite do leitor: a conexão não tem mais como ser lida
+                    await respostas.put(self.responder_agora(laco, b"ERR linha longa demais\n"))
+                    break
+                if not linha:
+                    break
+                partes = linha.split()
+                if not partes:
+                    continue
+
+                futuro = laco.create_future()
+                await respostas.put(futuro)
+                try:
+                    comando, argumentos = self.interpretar(partes)
+                except ValueError as erro:
+                    futuro.set_result(f"ERR {erro}\n".encode())
+                else:
+                    await self.fila.put((comando, argumentos, futuro))
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError: # Servidor encerrado por fechar(): as respostas pendentes são descartadas
+            enviando.cancel()
+            escritor.close()
+            return
+        finally:
+            self.conexoes.discard(tarefa)
+
+        await respostas.put(None)
+        await enviando
+
+    # Escreve as respostas da conexão na ordem dos pedidos, esperando o esvaziamento do buffer de saída
+    # (um cliente que não lê as respostas acaba parando a leitura dos seus próprios pedidos)
+    async def enviar_respostas(self, respostas, escritor):
+        conectado = True
+        while True:
+            futuro = await respostas.get()
+            if futuro is None:
+                break
+            resposta = await futuro
+            if conectado:
+                try:
+                    escritor.write(resposta)
+                    await escritor.drain()
+                except ConnectionError:
+                    conectado = False # Continua consumindo as respostas, para não travar a leitura
+        escritor.close()
+
+    # Retorna um futuro já resolvido com "resposta"
+    @staticmethod
+    def responder_agora(laco, resposta):
+        futuro = laco.create_future()
+        futuro.set_result(resposta)
+        return futuro
+
+    # Converte as palavras de uma linha em (comando, argumentos), gerando ValueError se o pedido for inválido
+    def interpretar(self, partes):
+        comando = partes[0].decode('ascii', 'replace').upper()
+        argumentos = partes[1:]
+        if comando in ('GET', 'DEL'):
+            if not argumentos:
+                raise ValueError(f"{comando} exige ao menos uma chave")
+            return comando, [int(chave) for chave in argumentos]
+        if comando == 'PUT':
+            if not argumentos or len(argumentos) % 2:
+                raise ValueError("PUT exige pares de chave e dado")
+            return comando, [(int(argumentos[i]), argumentos[i + 1].decode()) for i in range(0, len(argumentos), 2)]
+        if comando == 'RANGE':
+            if len(argumentos) not in (2, 3):
+                raise ValueError("RANGE exige início, fim e, opcionalmente, o limite")
+            inicio, fim = (None if parte == b"*" else int(parte) for parte in argumentos[:2])
+            quantidade = int(argumentos[2]) if len(argumentos) == 3 else LIMITE_RANGE_SERVIDOR
+            if quantidade < 1:
+                raise ValueError("RANGE exige um limite de pelo menos 1")
+            quantidade = min(quantidade, LIMITE_RANGE_SERVIDOR)
+            return comando, (inicio, fim, quantidade)
+        if comando == 'LEN':
+            return comando, ()
+        raise ValueError(f"comando desconhecido: {comando}")
+
+    # Funções da Fila
+
+    # Tarefa única que aplica os pedidos na árvore: a cada volta, retira tudo o que já está na fila (até lote_maximo)
+    # Enquanto um lote é aplicado, os pedidos que chegam se acumulam e formam o próximo lote
+    async def atender_fila(self):
+        fila = self.fila
+        while True:
+            pedidos = [await fila.get()]
+            while len(pedidos) < self.lote_maximo and not fila.empty():
+                pedidos.append(fila.get_nowait())
+            self.executar(pedidos)
+
+    # Aplica os pedidos em ordem, agrupando cada sequência de escritas iguais (PUT ou DEL) em uma única operação
+    def executar(self, pedidos):
+        inicio = 0
+        while inicio < len(pedidos):
+            comando = pedidos[inicio][0]
+            fim = inicio + 1
+            if comando in ('PUT', 'DEL'):
+                while fim < len(pedidos) and pedidos[fim][0] == comando:
+                    fim += 1
+            grupo = pedidos[inicio:fim]
+            try:
+                if comando == 'PUT':
+                    respostas = self.gravar(grupo)
+                elif comando == 'DEL':
+                    respostas = self.apagar(grupo)
+                else:
+                    respostas = [self.ler(comando, argumentos) for _, argumentos, _ in grupo]
+            except Exception as erro: # Um erro da árvore responde ao grupo, sem derrubar a tarefa
+                respostas = [f"ERR {erro}"] * len(grupo)
+            for (_, _, futuro), resposta in zip(grupo, respostas):
+                futuro.set_result(f"{resposta}\n".encode())
+            inicio = fim
+
+    # PUTs consecutivos: um único atualizar_lote com todos os pares (em chaves repetidas, vale o pedido mais recente)
+    def gravar(self, grupo):
+        self.arvore.atualizar_lote([par for _, pares, _ in grupo for par in pares])
+        return [f"OK {len(pares)}" for _, pares, _ in grupo]
+
+    # DELs consecutivos: todas as chaves são removidas com um único remover_lote, que informa as que existiam;
+    # cada pedido conta as removidas que ainda não foram contadas por um pedido anterior do grupo
+    def apagar(self, grupo):
+        removidas = []
+        self.arvore.remover_lote({chave for _, chaves, _ in grupo for chave in chaves}, removidas)
+        removidas = set(removidas)
+        respostas = []
+        for _, chaves, _ in grupo:
+            quantidade = 0
+            for chave in chaves:
+                if chave in removidas:
+                    removidas.discard(chave)
+                    quantidade += 1
+            respostas.append(f"OK {quantidade}")
+        return respostas
+
+    # GET, RANGE e LEN
+    def ler(self, comando, argumentos):
+        arvore = self.arvore
+        if comando == 'GET':
+            partes = ['OK']
+            for chave in argumentos:
+                no = arvore.buscar_no(arvore.raiz, chave)
+                if no is not None:
+                    partes.append(f"{chave} {no.dado}")
+            return ' '.join(partes)
+        if comando == 'RANGE':
+            inicio, fim, quantidade = argumentos
+            return ' '.join(['OK'] + [f"{chave} {dado}" for chave, dado in islice(arvore.items(inicio, fim), quantidade)])
+        return f"OK {len(arvore)}"
+
+# Fim Classe SERVIDOR_AVL
+
+# Função de linha de comando do servidor; executa até receber SIGINT (Ctrl+C) ou SIGTERM
+def principal_servidor(argumentos):
+    parser = argparse.ArgumentParser(description="Servidor da árvore AVL em um socket local, sem a interface gráfica")
+    parser.add_argument('--servidor', action='store_true', help="executa o servidor em vez da interface")
+    parser.add_argument('--host', default='127.0.0.1', help="endereço TCP (padrão: 127.0.0.1)")
+    parser.add_argument('--porta', type=int, default=PORTA_SERVIDOR, help=f"porta TCP (padrão: {PORTA_SERVIDOR})")
+    parser.add_argument('--unix', help="caminho de um socket Unix, usado no lugar do TCP")
+    parser.add_argument('--fila', type=int, default=4096, help="pedidos aguardando a árvore (padrão: 4096)")
+    parser.add_argument('--pendentes', type=int, default=256, help="respostas pendentes por conexão (padrão: 256)")
+    opcoes = parser.parse_args(argumentos)
+
+    servidor = SERVIDOR_AVL(tamanho_fila=opcoes.fila, pendentes_por_conexao=opcoes.pendentes)
+
+    async def servir():
+        parar = asyncio.Event()
+        laco = asyncio.get_running_loop()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                laco.add_signal_handler(sinal, parar.set)
+            except NotImplementedError: # Windows: fica o KeyboardInterrupt padrão
+                pass
+
+        await servidor.iniciar(opcoes.host, opcoes.porta, opcoes.unix)
+        print(f"Servindo em {opcoes.unix or f'{opcoes.host}:{opcoes.porta}'}", file=sys.stderr)
+        try:
+            await parar.wait()
+        finally:
+            await servidor.fechar()
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if opcoes.unix and os.path.exists(opcoes.unix):
+            os.unlink(opcoes.unix)
+    return 0
+# Fim Servidor
+
 # Chamada para a execução principal
 if __name__ == "__main__":
+    # Modos sem interface: benchmark das operações, com o resultado em JSON, e servidor em um socket local
+    if '--benchmark' in sys.argv[1:]:
+        sys.exit(principal_benchmark(sys.argv[1:]))
+    if '--servidor' in sys.argv[1:]:
+        sys.exit(principal_servidor(sys.argv[1:]))
+    if tk is None:
+        sys.exit("A interface gráfica requer matplotlib, numpy e tkinter (use --benchmark ou --servidor para os modos sem interface)")
+
     # Cria uma instância da classe INTERFACE_ARVORE_AVL
     programa = INTERFACE_ARVORE_AVL()
    
@@ -0,0 +1,163 @@
+# Agregados nos nós (monoides) e árvore de intervalos: aggregate() conferido contra a soma (ou o resumo) feita
+# por força bruta, sobrepostos() contra um filtro por força bruta, e o agregado guardado em cada nó conferido
+# depois de rotações, remoções e reconstruções das operações em lote
+import glob
+import importlib.util
+import os
+import random
+import unittest
+
+CAMINHO = glob.glob(os.path.join(os.path.dirname(__file__), '..', 'Implementa*o python Arvores AVL.py'))[0]
+especificacao = importlib.util.spec_from_file_location('arvore_avl', CAMINHO)
+avl = importlib.util.module_from_spec(especificacao)
+especificacao.loader.exec_module(avl)
+
+FAIXA = 500
+# Monoide não comutativo: a concatenação dos valores em ordem, que denuncia combinações na ordem errada
+MONOIDE_SEQUENCIA = avl.MONOIDE_AVL((), lambda a, b: a + b, lambda valor, dado: (valor,))
+
+
+# Confere (com as asserções do "caso" de teste) o agregado guardado em cada nó da subárvore, recalculado a partir
+# dos filhos, e o retorna
+def conferir_agregados(caso, arvore, no):
+    monoide = arvore.monoide
+    if no is None:
+        return monoide.identidade
+    agregado = monoide.combinar(monoide.combinar(conferir_agregados(caso, arvore, no.esquerda),
+                                                 monoide.medir(no.valor, no.dado)),
+                                conferir_agregados(caso, arvore, no.direita))
+    caso.assertEqual(no.agregado, agregado)
+    return agregado
+
+
+class TESTE_AGREGADOS(unittest.TestCase):
+
+    # Resumo por força bruta dos valores em [inicio, fim] (None = sem limite)
+    def resumir(self, monoide, pares, inicio, fim):
+        resultado = monoide.identidade
+        for valor, dado in sorted(pares):
+            if (inicio is None or inicio <= valor) and (fim is None or valor <= fim):
+                resultado = monoide.combinar(resultado, monoide.medir(valor, dado))
+        return resultado
+
+    # Confere os agregados dos nós e algumas consultas sorteadas (inclusive intervalos vazios e sem limites)
+    def conferir(self, arvore, pares, sorteio):
+        conferir_agregados(self, arvore, arvore.raiz)
+        consultas = [(None, None), (None, FAIXA // 2), (FAIXA // 2, None), (FAIXA, 0)]
+        for _ in range(10):
+            inicio = sorteio.randrange(-10, FAIXA + 10)
+            consultas.append((inicio, inicio + sorteio.randrange(0, FAIXA // 4)))
+        for inicio, fim in consultas:
+            self.assertEqual(arvore.aggregate(inicio, fim), self.resumir(arvore.monoide, pares, inicio, fim))
+
+    def test_insercoes_e_remocoes(self):
+        for classe in (avl.ARVORE_AVL, avl.ARVORE_AVL_PERSISTENTE):
+            for monoide in (avl.MONOIDE_SOMA, avl.MONOIDE_MINIMO, avl.MONOIDE_MAXIMO, MONOIDE_SEQUENCIA):
+                with self.subTest(classe=classe.__name__, monoide=monoide.identidade):
+                    sorteio = random.Random(repr(monoide.identidade))
+                    arvore = classe(estatisticas_de_ordem=True, monoide=monoide)
+                    valores = []
+                    for passo in range(600):
+                        valor = sorteio.randrange(FAIXA)
+                        if sorteio.random() < 0.6:
+                            arvore.raiz = arvore.inserir(arvore.raiz, valor)
+                            valores.append(valor)
+                        else:
+                            arvore.raiz = arvore.remover(arvore.raiz, valor)
+                            if valor in valores:
+                                valores.remove(valor)
+                        if passo % 20 == 0:
+                            self.conferir(arvore, [(valor, None) for valor in valores], sorteio)
+                        else:
+                            conferir_agregados(self, arvore, arvore.raiz)
+
+    # Lotes pequenos passam pelas inserções e remoções comuns; lotes grandes reconstroem a árvore
+    def test_operacoes_em_lote(self):
+        for classe in (avl.ARVORE_AVL, avl.ARVORE_AVL_PERSISTENTE):
+            for tamanho_lote in (3, 400):
+                with self.subTest(classe=classe.__name__, tamanho_lote=tamanho_lote):
+                    sorteio = random.Random(tamanho_lote)
+                    arvore = classe(monoide=MONOIDE_SEQUENCIA)
+                    valores = [sorteio.randrange(FAIXA) for _ in range(300)]
+                    arvore.bulk_load(valores, manter_duplicados=True)
+                    self.conferir(arvore, [(valor, None) for valor in valores], sorteio)
+                    for _ in range(5):
+                        lote = [sorteio.randrange(FAIXA) for _ in range(tamanho_lote)]
+                        arvore.inserir_lote(lote)
+                        valores.extend(lote)
+                        self.conferir(arvore, [(valor, None) for valor in valores], sorteio)
+
+                        lote = [sorteio.randrange(FAIXA) for _ in range(tamanho_lote)]
+                        arvore.remover_lote(lote)
+                        for valor in lote:
+                            if valor in valores:
+                                valores.remove(valor)
+                        self.conferir(arvore, [(valor, None) for valor in valores], sorteio)
+
+    # No modo mapa, o monoide pode medir a carga: trocar a carga de uma chave refaz os agregados do caminho
+    def test_cargas_do_modo_mapa(self):
+        monoide = avl.MONOIDE_AVL(0, lambda a, b: a + b, lambda chave, dado: dado)
+        for tamanho_lote in (3, 400):
+            with self.subTest(tamanho_lote=tamanho_lote):
+                sorteio = random.Random(tamanho_lote)
+                arvore = avl.ARVORE_AVL(monoide=monoide, mapa=True)
+                cargas = {}
+                for _ in range(5):
+                    lote = [(sorteio.randrange(FAIXA), sorteio.randrange(100)) for _ in range(tamanho_lote)]
+                    arvore.atualizar_lote(lote)
+                    cargas.update(lote)
+                    chave = sorteio.choice(list(cargas))
+                    arvore[chave] = cargas[chave] = sorteio.randrange(100)
+                    del arvore[chave]
+                    del cargas[chave]
+                    self.conferir(arvore, list(cargas.items()), sorteio)
+
+    def test_sem_monoide(self):
+        with self.assertRaises(ValueError):
+            avl.ARVORE_AVL().aggregate(0, 10)
+
+
+class TESTE_INTERVALOS(unittest.TestCase):
+
+    # Filtro por força bruta: os intervalos fechados que se sobrepõem a [inicio, fim], em ordem
+    def sobrepostos(self, intervalos, inicio, fim):
+        return [intervalo for intervalo in sorted(intervalos) if intervalo[0] <= fim and inicio <= intervalo[1]]
+
+    def conferir(self, arvore, intervalos, sorteio):
+        conferir_agregados(self, arvore, arvore.raiz)
+        for _ in range(20):
+            inicio = sorteio.randrange(-10, FAIXA + 10)
+            fim = inicio + sorteio.choice((0, 0, 5, 50, FAIXA))
+            self.assertEqual(list(arvore.sobrepostos(inicio, fim)), self.sobrepostos(intervalos, inicio, fim))
+
+    def test_sobrepostos(self):
+        sorteio = random.Random(0)
+        arvore = avl.ARVORE_AVL_INTERVALOS()
+        intervalos = []
+        for passo in range(800):
+            if intervalos and sorteio.random() < 0.35:
+                intervalo = sorteio.choice(intervalos)
+                arvore.raiz = arvore.remover(arvore.raiz, intervalo)
+                intervalos.remove(intervalo)
+            else:
+                inicio = sorteio.randrange(FAIXA)
+                intervalo = (inicio, inicio + sorteio.choice((0, 3, 20, 200)))
+                arvore.raiz = arvore.inserir(arvore.raiz, intervalo)
+                intervalos.append(intervalo)
+            if passo % 25 == 0:
+                self.conferir(arvore, intervalos, sorteio)
+            else:
+                conferir_agregados(self, arvore, arvore.raiz)
+
+        # Reconstrução em lote: os agregados são refeitos de baixo para cima
+        lote = [(inicio, inicio + sorteio.randrange(50)) for inicio in sorteio.sample(range(FAIXA), 300)]
+        arvore.inserir_lote(lote)
+        intervalos.extend(lote)
+        self.conferir(arvore, intervalos, sorteio)
+
+    def test_arvore_vazia(self):
+        self.assertEqual(list(avl.ARVORE_AVL_INTERVALOS().sobrepostos(0, 10)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
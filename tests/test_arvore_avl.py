@@ -0,0 +1,100 @@
+# Inserção, remoção e busca iterativas da ARVORE_AVL: sequências aleatórias conferidas, passo a passo, contra uma
+# lista ordenada e contra as invariantes da árvore (alturas, balanceamento e ordem)
+import bisect
+import glob
+import importlib.util
+import os
+import random
+import unittest
+
+CAMINHO = glob.glob(os.path.join(os.path.dirname(__file__), '..', 'Implementa*o python Arvores AVL.py'))[0]
+especificacao = importlib.util.spec_from_file_location('arvore_avl', CAMINHO)
+avl = importlib.util.module_from_spec(especificacao)
+especificacao.loader.exec_module(avl)
+
+PASSOS = 1500
+FAIXA = 200 # Valores sorteados em [0, FAIXA): pequena o bastante para haver repetições e remoções que acertam
+
+
+class TESTE_ARVORE_AVL(unittest.TestCase):
+
+    # Confere a subárvore e retorna (altura, tamanho): a altura guardada em cada nó é a calculada, o balanceamento
+    # fica em [-1, 1] e, com estatísticas de ordem, o tamanho guardado é o calculado
+    def conferir_no(self, arvore, no):
+        if no is None:
+            return 0, 0
+        altura_esquerda, tamanho_esquerda = self.conferir_no(arvore, no.esquerda)
+        altura_direita, tamanho_direita = self.conferir_no(arvore, no.direita)
+        self.assertEqual(no.altura, 1 + max(altura_esquerda, altura_direita))
+        self.assertLessEqual(abs(altura_esquerda - altura_direita), 1)
+        tamanho = 1 + tamanho_esquerda + tamanho_direita
+        if arvore.estatisticas_de_ordem:
+            self.assertEqual(no.tamanho, tamanho)
+        return no.altura, tamanho
+
+    # Invariantes da árvore inteira contra o modelo (lista ordenada dos valores)
+    def conferir(self, arvore, modelo):
+        _, tamanho = self.conferir_no(arvore, arvore.raiz)
+        self.assertEqual(tamanho, len(modelo))
+        self.assertEqual(arvore.listar_em_ordem(arvore.raiz), modelo)
+
+    # Sorteia inserções (60%) e remoções, conferindo a árvore depois de cada passo
+    def executar(self, arvore, semente):
+        sorteio = random.Random(semente)
+        modelo = []
+        for _ in range(PASSOS):
+            valor = sorteio.randrange(FAIXA)
+            if sorteio.random() < 0.6:
+                arvore.raiz = arvore.inserir(arvore.raiz, valor)
+                bisect.insort(modelo, valor)
+            else:
+                arvore.raiz = arvore.remover(arvore.raiz, valor)
+                posicao = bisect.bisect_left(modelo, valor)
+                if posicao < len(modelo) and modelo[posicao] == valor:
+                    del modelo[posicao]
+            self.conferir(arvore, modelo)
+            self.assertEqual(bool(arvore.buscar(arvore.raiz, valor)), valor in modelo)
+        return modelo
+
+    def test_inserir_e_remover_aleatorios(self):
+        for semente in range(3):
+            with self.subTest(semente=semente):
+                self.executar(avl.ARVORE_AVL(), semente)
+
+    def test_inserir_e_remover_com_estatisticas_de_ordem(self):
+        arvore = avl.ARVORE_AVL(estatisticas_de_ordem=True)
+        modelo = self.executar(arvore, 10)
+        self.assertEqual(len(arvore), len(modelo))
+        if modelo:
+            self.assertEqual(arvore.select(0), modelo[0])
+            self.assertEqual(arvore.select(-1), modelo[-1])
+
+    # Sequências ordenadas forçam rotações no mesmo lado a cada inserção; esvaziar pela raiz força o caso de dois filhos
+    def test_sequencias_ordenadas(self):
+        for valores in (list(range(500)), list(range(500, 0, -1))):
+            arvore = avl.ARVORE_AVL()
+            modelo = []
+            for valor in valores:
+                arvore.raiz = arvore.inserir(arvore.raiz, valor)
+                bisect.insort(modelo, valor)
+                self.conferir(arvore, modelo)
+            while arvore.raiz:
+                valor = arvore.raiz.valor
+                arvore.raiz = arvore.remover(arvore.raiz, valor)
+                modelo.remove(valor)
+                self.conferir(arvore, modelo)
+
+    # Remover um valor ausente não altera a árvore
+    def test_remover_ausente(self):
+        arvore = avl.ARVORE_AVL()
+        for valor in range(0, 100, 2):
+            arvore.raiz = arvore.inserir(arvore.raiz, valor)
+        raiz = arvore.raiz
+        for valor in range(1, 100, 2):
+            self.assertIs(arvore.remover(arvore.raiz, valor), raiz)
+            self.assertFalse(arvore.buscar(arvore.raiz, valor))
+        self.conferir(arvore, list(range(0, 100, 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# Leitores sem trava da ARVORE_AVL_CONCORRENTE: cada consulta deve enxergar uma única versão da árvore,
+# mesmo com um escritor publicando raízes novas o tempo todo
+import glob
+import importlib.util
+import os
+import sys
+import threading
+import time
+import unittest
+
+CAMINHO = glob.glob(os.path.join(os.path.dirname(__file__), '..', 'Implementa*o python Arvores AVL.py'))[0]
+especificacao = importlib.util.spec_from_file_location('arvore_avl', CAMINHO)
+avl = importlib.util.module_from_spec(especificacao)
+especificacao.loader.exec_module(avl)
+
+TAMANHO = 200
+DURACAO = 1.0 # Segundos de disputa entre o escritor e os leitores
+
+
+class TESTE_LEITORES_CONCORRENTES(unittest.TestCase):
+
+    def setUp(self):
+        self.intervalo = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # Trocas de thread frequentes, para que as corridas apareçam
+
+    def tearDown(self):
+        sys.setswitchinterval(self.intervalo)
+
+    # O escritor alterna entre duas versões publicadas (cheia e vazia); toda leitura deve corresponder a uma delas
+    def test_consultas_enxergam_uma_unica_versao(self):
+        arvore = avl.ARVORE_AVL_CONCORRENTE(estatisticas_de_ordem=True)
+        arvore.bulk_load(range(TAMANHO))
+        cheia = arvore.raiz
+        parar = threading.Event()
+        erros = []
+
+        def escrever():
+            while not parar.is_set():
+                with arvore.escrita:
+                    arvore.raiz = None
+                with arvore.escrita:
+                    arvore.raiz = cheia
+
+        def ler():
+            try:
+                while not parar.is_set():
+                    self.assertIn(len(arvore), (0, TAMANHO))
+                    self.assertIn(arvore.count_range(0, TAMANHO), (0, TAMANHO))
+                    self.assertIn(arvore.metricas_estruturais()['nos'], (0, TAMANHO))
+                    try:
+                        self.assertEqual(arvore.select(-1), TAMANHO - 1)
+                    except IndexError: # Versão vazia
+                        pass
+            except Exception as erro: # Repassado à thread principal
+                erros.append(erro)
+
+        threads = [threading.Thread(target=escrever)] + [threading.Thread(target=ler) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(DURACAO)
+        parar.set()
+        for thread in threads:
+            thread.join()
+
+        if erros:
+            raise erros[0]
+
+    # Escritas reais (inserções e remoções) com leitores: o tamanho e a contagem de cada leitura são coerentes
+    def test_leituras_durante_escritas(self):
+        arvore = avl.ARVORE_AVL_CONCORRENTE(estatisticas_de_ordem=True)
+        parar = threading.Event()
+        erros = []
+
+        def escrever():
+            while not parar.is_set():
+                for valor in range(TAMANHO):
+                    with arvore.escrita:
+                        arvore.raiz = arvore.inserir(arvore.raiz, valor)
+                for valor in range(TAMANHO):
+                    with arvore.escrita:
+                        arvore.raiz = arvore.remover(arvore.raiz, valor)
+
+        def ler():
+            try:
+                while not parar.is_set():
+                    versao = arvore.versao() # Referência fixa para conferir as consultas da própria versão
+                    quantidade = len(versao)
+                    self.assertEqual(versao.count_range(0, TAMANHO), quantidade)
+                    self.assertEqual(versao.metricas_estruturais()['nos'], quantidade)
+                    self.assertLessEqual(arvore.count_range(0, TAMANHO), TAMANHO)
+                    if quantidade:
+                        self.assertEqual(versao.select(quantidade - 1), max(versao))
+            except Exception as erro:
+                erros.append(erro)
+
+        threads = [threading.Thread(target=escrever)] + [threading.Thread(target=ler) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(DURACAO)
+        parar.set()
+        for thread in threads:
+            thread.join()
+
+        if erros:
+            raise erros[0]
+
+
+    # Corrida determinística: um "escritor" publica a outra versão a cada verificação feita no início das consultas,
+    # ou seja, exatamente entre a verificação e a descida
+    def test_escrita_entre_a_verificacao_e_a_descida(self):
+        class ARVORE_ALTERNADA(avl.ARVORE_AVL_CONCORRENTE):
+            def exigir_estatisticas_de_ordem(self):
+                super().exigir_estatisticas_de_ordem()
+                self.raiz = self.vazia if self.raiz is self.cheia else self.cheia
+
+        arvore = ARVORE_ALTERNADA(estatisticas_de_ordem=True)
+        arvore.bulk_load(range(TAMANHO))
+        arvore.cheia, arvore.vazia = arvore.raiz, None
+
+        for _ in range(4):
+            self.assertIn(arvore.count_range(50, 149), (0, 100))
+            try:
+                self.assertEqual(arvore.select(0), 0)
+            except IndexError:
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# Junção, divisão e operações de conjunto (união, interseção e diferença) conferidas contra o set do Python,
+# com as invariantes de altura, tamanho e agregado verificadas em cada resultado
+# Na ARVORE_AVL_PERSISTENTE, as árvores de entrada precisam continuar intactas depois de cada operação
+import glob
+import importlib.util
+import os
+import random
+import unittest
+
+CAMINHO = glob.glob(os.path.join(os.path.dirname(__file__), '..', 'Implementa*o python Arvores AVL.py'))[0]
+especificacao = importlib.util.spec_from_file_location('arvore_avl', CAMINHO)
+avl = importlib.util.module_from_spec(especificacao)
+especificacao.loader.exec_module(avl)
+
+RODADAS = 150
+FAIXA = 1000
+CLASSES = (avl.ARVORE_AVL, avl.ARVORE_AVL_PERSISTENTE)
+
+
+class TESTE_CONJUNTOS(unittest.TestCase):
+
+    # Confere a subárvore e retorna (altura, tamanho, soma), comparando com o que cada nó guarda
+    def conferir_no(self, no):
+        if no is None:
+            return 0, 0, 0
+        altura_esquerda, tamanho_esquerda, soma_esquerda = self.conferir_no(no.esquerda)
+        altura_direita, tamanho_direita, soma_direita = self.conferir_no(no.direita)
+        self.assertLessEqual(abs(altura_esquerda - altura_direita), 1)
+        altura = 1 + max(altura_esquerda, altura_direita)
+        tamanho = 1 + tamanho_esquerda + tamanho_direita
+        soma = no.valor + soma_esquerda + soma_direita
+        self.assertEqual((no.altura, no.tamanho, no.agregado), (altura, tamanho, soma))
+        return altura, tamanho, soma
+
+    # Confere as invariantes da raiz e o seu conteúdo contra o conjunto esperado
+    def conferir(self, arvore, raiz, esperado):
+        self.conferir_no(raiz)
+        self.assertEqual(arvore.listar_em_ordem(raiz), sorted(esperado))
+
+    def nova_arvore(self, classe):
+        return classe(estatisticas_de_ordem=True, monoide=avl.MONOIDE_SOMA)
+
+    # Constrói uma raiz com os valores do conjunto, na própria árvore (as operações recebem e retornam raízes)
+    def construir(self, arvore, valores):
+        arvore.bulk_load(sorted(valores))
+        return arvore.raiz
+
+    # Sorteia um conjunto; os tamanhos variam bastante, para que as alturas das entradas fiquem diferentes
+    def sortear(self, sorteio):
+        return set(sorteio.sample(range(FAIXA), sorteio.choice((0, 1, 5, 50, 300, 900))))
+
+    def test_operacoes_de_conjunto(self):
+        operacoes = (('union', set.union), ('intersection', set.intersection), ('difference', set.difference))
+        for classe in CLASSES:
+            sorteio = random.Random(classe.__name__)
+            for _ in range(RODADAS):
+                a, b = self.sortear(sorteio), self.sortear(sorteio)
+                for nome, referencia in operacoes:
+                    with self.subTest(classe=classe.__name__, operacao=nome, tamanhos=(len(a), len(b))):
+                        arvore = self.nova_arvore(classe)
+                        raiz1, raiz2 = self.construir(arvore, a), self.construir(arvore, b)
+                        resultado = getattr(arvore, nome)(raiz1, raiz2)
+                        self.conferir(arvore, resultado, referencia(a, b))
+                        if classe is avl.ARVORE_AVL_PERSISTENTE:
+                            self.conferir(arvore, raiz1, a)
+                            self.conferir(arvore, raiz2, b)
+
+    def test_split(self):
+        for classe in CLASSES:
+            sorteio = random.Random(classe.__name__)
+            for _ in range(RODADAS):
+                a = self.sortear(sorteio)
+                valor = sorteio.randrange(-1, FAIXA + 1) # Presente ou ausente, inclusive fora da faixa
+                with self.subTest(classe=classe.__name__, tamanho=len(a), valor=valor):
+                    arvore = self.nova_arvore(classe)
+                    raiz = self.construir(arvore, a)
+                    menores, no, maiores = arvore.split(raiz, valor)
+                    self.conferir(arvore, menores, {x for x in a if x < valor})
+                    self.conferir(arvore, maiores, {x for x in a if x > valor})
+                    if valor in a:
+                        self.assertEqual(no.valor, valor)
+                    else:
+                        self.assertIsNone(no)
+                    if classe is avl.ARVORE_AVL_PERSISTENTE:
+                        self.conferir(arvore, raiz, a)
+
+    # join(menores, valor, maiores) com árvores de alturas bem diferentes dos dois lados
+    def test_join(self):
+        for classe in CLASSES:
+            sorteio = random.Random(classe.__name__)
+            for _ in range(RODADAS):
+                valor = sorteio.randrange(FAIXA)
+                esquerda = {x for x in self.sortear(sorteio) if x < valor}
+                direita = {x for x in self.sortear(sorteio) if x > valor}
+                with self.subTest(classe=classe.__name__, tamanhos=(len(esquerda), len(direita))):
+                    arvore = self.nova_arvore(classe)
+                    raiz1, raiz2 = self.construir(arvore, esquerda), self.construir(arvore, direita)
+                    resultado = arvore.join(raiz1, valor, raiz2)
+                    self.conferir(arvore, resultado, esquerda | direita | {valor})
+                    if classe is avl.ARVORE_AVL_PERSISTENTE:
+                        self.conferir(arvore, raiz1, esquerda)
+                        self.conferir(arvore, raiz2, direita)
+
+    # Dividir e juntar de volta pelo mesmo valor reconstrói o conjunto original
+    def test_split_e_join(self):
+        sorteio = random.Random(0)
+        for _ in range(RODADAS):
+            a = self.sortear(sorteio) | {FAIXA // 2}
+            arvore = self.nova_arvore(avl.ARVORE_AVL)
+            menores, no, maiores = arvore.split(self.construir(arvore, a), FAIXA // 2)
+            self.conferir(arvore, arvore.join(menores, no.valor, maiores), a)
+
+    # As operações de conjunto não passam pelas métricas de inserir/remover/buscar
+    def test_metricas_intactas(self):
+        arvore = self.nova_arvore(avl.ARVORE_AVL)
+        metricas = arvore.ativar_metricas()
+        raiz1, raiz2 = self.construir(arvore, range(0, 600, 2)), self.construir(arvore, range(0, 600, 3))
+        arvore.intersection(raiz1, raiz2)
+        self.assertEqual(metricas.operacoes, {'inserir': 0, 'remover': 0, 'buscar': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
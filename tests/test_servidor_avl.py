@@ -0,0 +1,158 @@
+# Protocolo do SERVIDOR_AVL por um socket TCP de verdade (porta 0, escolhida pelo sistema): respostas na ordem dos
+# pedidos enviados em sequência, erros que não fecham a conexão, limite do RANGE e as contagens dos PUTs e DELs
+# agrupados em uma única operação em lote
+import asyncio
+import glob
+import importlib.util
+import os
+import random
+import unittest
+
+CAMINHO = glob.glob(os.path.join(os.path.dirname(__file__), '..', 'Implementa*o python Arvores AVL.py'))[0]
+especificacao = importlib.util.spec_from_file_location('arvore_avl', CAMINHO)
+avl = importlib.util.module_from_spec(especificacao)
+especificacao.loader.exec_module(avl)
+
+
+# Árvore do servidor que registra as operações em lote recebidas, para conferir o agrupamento dos pedidos
+class ARVORE_REGISTRADA(avl.ARVORE_AVL):
+
+    def __init__(self):
+        super().__init__(estatisticas_de_ordem=True, mapa=True)
+        self.lotes = []
+
+    def atualizar_lote(self, pares):
+        self.lotes.append('PUT')
+        return super().atualizar_lote(pares)
+
+    def remover_lote(self, valores, removidos=None):
+        self.lotes.append('DEL')
+        return super().remover_lote(valores, removidos)
+
+
+class TESTE_SERVIDOR(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.servidor = avl.SERVIDOR_AVL(ARVORE_REGISTRADA())
+        ouvinte = await self.servidor.iniciar(porta=0)
+        self.porta = ouvinte.sockets[0].getsockname()[1]
+        self.clientes = []
+
+    async def asyncTearDown(self):
+        for escritor in self.clientes:
+            escritor.close()
+        await self.servidor.fechar()
+
+    async def conectar(self):
+        leitor, escritor = await asyncio.open_connection('127.0.0.1', self.porta)
+        self.clientes.append(escritor)
+        return leitor, escritor
+
+    # Envia todas as linhas de uma só vez (sem esperar respostas) e lê uma resposta por linha
+    async def pedir(self, conexao, linhas):
+        leitor, escritor = conexao
+        escritor.write(''.join(linha + '\n' for linha in linhas).encode())
+        await escritor.drain()
+        respostas = []
+        for _ in linhas:
+            resposta = await asyncio.wait_for(leitor.readline(), 10)
+            self.assertTrue(resposta.endswith(b'\n'), "conexão fechada antes da resposta")
+            respostas.append(resposta.decode().rstrip('\n'))
+        return respostas
+
+    # Pedidos sorteados enviados em sequência, conferidos um a um contra um dicionário aplicado na mesma ordem
+    async def test_pedidos_em_sequencia(self):
+        sorteio = random.Random(0)
+        modelo = {}
+        linhas, esperadas = [], []
+        for _ in range(500):
+            comando = sorteio.choice(('PUT', 'PUT', 'DEL', 'GET', 'RANGE', 'LEN'))
+            chaves = [sorteio.randrange(100) for _ in range(sorteio.randrange(1, 6))]
+            if comando == 'PUT':
+                pares = [(chave, f"d{sorteio.randrange(1000)}") for chave in chaves]
+                linhas.append('PUT ' + ' '.join(f"{chave} {dado}" for chave, dado in pares))
+                modelo.update(pares)
+                esperadas.append(f"OK {len(pares)}")
+            elif comando == 'DEL':
+                linhas.append('DEL ' + ' '.join(map(str, chaves)))
+                presentes = {chave for chave in chaves if chave in modelo}
+                for chave in presentes:
+                    del modelo[chave]
+                esperadas.append(f"OK {len(presentes)}")
+            elif comando == 'GET':
+                linhas.append('GET ' + ' '.join(map(str, chaves)))
+                esperadas.append(' '.join(['OK'] + [f"{chave} {modelo[chave]}" for chave in chaves if chave in modelo]))
+            elif comando == 'RANGE':
+                inicio = sorteio.randrange(100)
+                fim, limite = inicio + sorteio.randrange(30), sorteio.randrange(1, 10)
+                linhas.append(f"RANGE {inicio} {fim} {limite}")
+                selecionadas = [chave for chave in sorted(modelo) if inicio <= chave <= fim][:limite]
+                esperadas.append(' '.join(['OK'] + [f"{chave} {modelo[chave]}" for chave in selecionadas]))
+            else:
+                linhas.append('LEN')
+                esperadas.append(f"OK {len(modelo)}")
+
+        self.assertEqual(await self.pedir(await self.conectar(), linhas), esperadas)
+
+    # Duas conexões: cada uma recebe as suas respostas, e a segunda enxerga as escritas já respondidas à primeira
+    async def test_conexoes_separadas(self):
+        primeira, segunda = await self.conectar(), await self.conectar()
+        self.assertEqual(await self.pedir(primeira, ['PUT 1 um 2 dois', 'LEN']), ['OK 2', 'OK 2'])
+        self.assertEqual(await self.pedir(segunda, ['GET 2 1 3', 'DEL 1']), ['OK 2 dois 1 um', 'OK 1'])
+        self.assertEqual(await self.pedir(primeira, ['LEN']), ['OK 1'])
+
+    # Pedidos inválidos recebem ERR na sua posição, e a conexão continua atendendo os seguintes
+    async def test_erros_nao_fecham_a_conexao(self):
+        conexao = await self.conectar()
+        invalidos = ['FOO 1', 'GET', 'GET x', 'PUT 1', 'DEL 1.5', 'RANGE 1', 'RANGE 1 2 3 4']
+        respostas = await self.pedir(conexao, ['PUT 1 um'] + invalidos + ['GET 1'])
+        self.assertEqual(respostas[0], 'OK 1')
+        for linha, resposta in zip(invalidos, respostas[1:-1]):
+            self.assertTrue(resposta.startswith('ERR '), (linha, resposta))
+        self.assertEqual(respostas[-1], 'OK 1 um')
+
+        # Linhas em branco não recebem resposta; a conexão segue utilizável depois de tudo
+        leitor, escritor = conexao
+        escritor.write(b'\n   \nLEN\n')
+        self.assertEqual(await asyncio.wait_for(leitor.readline(), 10), b'OK 1\n')
+
+    async def test_limite_do_range(self):
+        conexao = await self.conectar()
+        quantidade = avl.LIMITE_RANGE_SERVIDOR + 200
+        await self.pedir(conexao, ['PUT ' + ' '.join(f"{chave} d" for chave in range(quantidade))])
+
+        respostas = await self.pedir(conexao, ['RANGE * * 0', 'RANGE 0 10 -3', 'RANGE * * x',
+                                               'RANGE 5 * 2', 'RANGE * *', f"RANGE * * {quantidade}", 'RANGE 7 3 5'])
+        for resposta in respostas[:3]:
+            self.assertTrue(resposta.startswith('ERR '), resposta)
+        self.assertEqual(respostas[3], 'OK 5 d 6 d')
+        # Sem limite, ou com um limite maior que o máximo, vale LIMITE_RANGE_SERVIDOR
+        for resposta in respostas[4:6]:
+            self.assertEqual(len(resposta.split()), 1 + 2 * avl.LIMITE_RANGE_SERVIDOR)
+        self.assertEqual(respostas[6], 'OK')
+
+    # PUTs e DELs consecutivos viram uma operação em lote cada, e cada pedido ainda recebe a sua própria contagem
+    async def test_agrupamento_de_escritas(self):
+        arvore = self.servidor.arvore
+        arvore.atualizar_lote([(chave, 'x') for chave in range(10)])
+        arvore.lotes.clear()
+
+        laco = asyncio.get_running_loop()
+        linhas = ['PUT 1 a 2 b 20 c', 'PUT 20 d 21 e', 'DEL 1 1 99', 'DEL 1 2 3', 'DEL 3 4 4 20', 'LEN', 'GET 1 20 21',
+                  'DEL 21', 'PUT 1 f']
+        pedidos = [self.servidor.interpretar(linha.encode().split()) + (laco.create_future(),) for linha in linhas]
+        self.servidor.executar(pedidos)
+
+        respostas = [futuro.result().decode().rstrip('\n') for _, _, futuro in pedidos]
+        self.assertEqual(respostas, ['OK 3', 'OK 2', 'OK 1', 'OK 2', 'OK 2', 'OK 7', 'OK 21 e', 'OK 1', 'OK 1'])
+        self.assertEqual(arvore.lotes, ['PUT', 'DEL', 'DEL', 'PUT'])
+        self.assertEqual(list(arvore.items()), [(0, 'x'), (1, 'f')] + [(chave, 'x') for chave in range(5, 10)])
+
+        # Os mesmos pedidos pelo socket, de uma só vez, recebem as mesmas contagens
+        arvore.raiz = None
+        arvore.atualizar_lote([(chave, 'x') for chave in range(10)])
+        self.assertEqual(await self.pedir(await self.conectar(), linhas), respostas)
+
+
+if __name__ == '__main__':
+    unittest.main()
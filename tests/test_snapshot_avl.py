@@ -0,0 +1,140 @@
+# Formato do snapshot em disco: save() seguido de load(), mapeado (mmap=True) ou lido para a memória (mmap=False),
+# devolve a mesma árvore; arquivos truncados ou de outro formato são recusados por ler_snapshot
+import glob
+import importlib.util
+import os
+import random
+import tempfile
+import unittest
+
+CAMINHO = glob.glob(os.path.join(os.path.dirname(__file__), '..', 'Implementa*o python Arvores AVL.py'))[0]
+especificacao = importlib.util.spec_from_file_location('arvore_avl', CAMINHO)
+avl = importlib.util.module_from_spec(especificacao)
+especificacao.loader.exec_module(avl)
+
+
+class TESTE_SNAPSHOT(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.diretorio.name, 'arvore.avl')
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    # Grava uma árvore com valores sorteados (com repetições) e retorna os valores em ordem
+    def gravar(self, quantidade=2000, tipo_valor='q'):
+        sorteio = random.Random(quantidade)
+        valores = [sorteio.randrange(quantidade) for _ in range(quantidade)]
+        if tipo_valor == 'd':
+            valores = [valor / 4 for valor in valores]
+        arvore = avl.ARVORE_AVL()
+        for valor in valores:
+            arvore.raiz = arvore.inserir(arvore.raiz, valor)
+        arvore.save(self.caminho, tipo_valor)
+        return sorted(valores)
+
+    # Confere a árvore carregada: alturas e balanceamento nos vetores do pool, percurso, buscas e intervalos
+    def conferir(self, arvore, valores):
+        pool = arvore.nos
+
+        def altura(no):
+            if not no:
+                return 0
+            esquerda, direita = altura(pool.esquerda[no]), altura(pool.direita[no])
+            self.assertLessEqual(abs(esquerda - direita), 1)
+            self.assertEqual(pool.altura[no], 1 + max(esquerda, direita))
+            return pool.altura[no]
+
+        altura(arvore.raiz)
+        self.assertEqual(len(arvore), len(valores))
+        self.assertEqual(arvore.listar_em_ordem(arvore.raiz), valores)
+        presentes = set(valores)
+        for valor in (valores[0], valores[len(valores) // 2], valores[-1], -1, valores[-1] + 1):
+            self.assertEqual(bool(arvore.buscar(arvore.raiz, valor)), valor in presentes)
+        inicio, fim = valores[len(valores) // 4], valores[3 * len(valores) // 4]
+        self.assertEqual(list(arvore.range(inicio, fim)), [valor for valor in valores if inicio <= valor <= fim])
+
+    def test_ida_e_volta_mapeada(self):
+        for tipo_valor in ('q', 'd'):
+            with self.subTest(tipo_valor=tipo_valor):
+                valores = self.gravar(tipo_valor=tipo_valor)
+                with avl.ARVORE_AVL.load(self.caminho, mmap=True) as arvore:
+                    self.assertIsInstance(arvore, avl.ARVORE_AVL_MAPEADA)
+                    self.conferir(arvore, valores)
+                    with self.assertRaises(TypeError):
+                        arvore.inserir(arvore.raiz, 0)
+
+    def test_ida_e_volta_em_memoria(self):
+        valores = self.gravar()
+        arvore = avl.ARVORE_AVL.load(self.caminho, mmap=False)
+        self.assertIsInstance(arvore, avl.ARVORE_AVL_COMPACTA)
+        self.conferir(arvore, valores)
+
+        # A árvore carregada pode ser modificada e gravada de novo
+        arvore.raiz = arvore.inserir(arvore.raiz, -5)
+        arvore.save(self.caminho)
+        with avl.ARVORE_AVL.load(self.caminho) as recarregada:
+            self.conferir(recarregada, [-5] + valores)
+
+    def test_arvore_vazia(self):
+        avl.ARVORE_AVL().save(self.caminho)
+        for mmap in (True, False):
+            arvore = avl.ARVORE_AVL.load(self.caminho, mmap=mmap)
+            self.assertEqual(len(arvore), 0)
+            self.assertFalse(arvore.buscar(arvore.raiz, 1))
+            if mmap:
+                arvore.fechar()
+
+    def test_arquivo_truncado(self):
+        self.gravar(100)
+        with open(self.caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+
+        tamanho_cabecalho = avl.CABECALHO_SNAPSHOT.size
+        for tamanho in (0, 4, tamanho_cabecalho - 1, tamanho_cabecalho, len(conteudo) // 2, len(conteudo) - 1):
+            with self.subTest(tamanho=tamanho):
+                with self.assertRaises(ValueError):
+                    avl.ler_snapshot(conteudo[:tamanho])
+                with open(self.caminho, 'wb') as arquivo:
+                    arquivo.write(conteudo[:tamanho])
+                for mmap in (True, False):
+                    with self.assertRaises(ValueError):
+                        avl.ARVORE_AVL.load(self.caminho, mmap=mmap)
+
+    def test_formato_errado(self):
+        self.gravar(100)
+        with open(self.caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+
+        alterados = {
+            'magico': b'XYZ1' + conteudo[4:],
+            'versao': conteudo[:4] + bytes([avl.VERSAO_SNAPSHOT + 1]) + conteudo[5:],
+            'tipo_valor': conteudo[:5] + b'x' + conteudo[6:],
+            'texto': b'nao e um snapshot de arvore avl, apenas texto comum\n' * 4,
+        }
+        for nome, alterado in alterados.items():
+            with self.subTest(alteracao=nome):
+                with self.assertRaises(ValueError):
+                    avl.ler_snapshot(alterado)
+                with open(self.caminho, 'wb') as arquivo:
+                    arquivo.write(alterado)
+                for mmap in (True, False):
+                    with self.assertRaises(ValueError):
+                        avl.ARVORE_AVL.load(self.caminho, mmap=mmap)
+
+    # Só árvores de valores numéricos, sem cargas e sem função key, podem ser gravadas
+    def test_arvores_que_nao_podem_ser_gravadas(self):
+        mapa = avl.ARVORE_AVL(mapa=True)
+        mapa[1] = 'um'
+        com_key = avl.ARVORE_AVL(key=abs)
+        com_key.raiz = com_key.inserir(com_key.raiz, -1)
+        for arvore in (mapa, com_key):
+            with self.assertRaises(ValueError):
+                arvore.save(self.caminho)
+        with self.assertRaises(ValueError):
+            avl.ARVORE_AVL().save(self.caminho, tipo_valor='x')
+
+
+if __name__ == '__main__':
+    unittest.main()